@@ -7,7 +7,13 @@ from flask import Flask, render_template, request, jsonify, session
 from control import SystemController
 from education import EducationAssistant
 from conversation_state import ConversationState
-from groq import Groq
+from chat_history import ChatHistory
+from llm_gateway import create_gateway
+from response_cache import ResponseCache
+from speech_to_text import (WHISPER_SAMPLE_RATE, AudioTooLong, TranscriptionQueueFull, decode_audio_file,
+                            get_worker_pool)
+import concurrent.futures
+import io
 import os
 from datetime import datetime, timedelta
 import secrets
@@ -31,10 +37,29 @@ education = EducationAssistant()
 # GROQ API Configuration (for AI responses)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-api-key-here")
 GROQ_MODEL = "llama-3.1-8b-instant"
+LLM_TIMEOUT = 10.0      # seconds per LLM call; a Flask worker is never held longer
+LLM_HEDGE_AFTER = None  # seconds; send a second identical request if the first is this slow
+LLM_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "llm_cache.sqlite")
+LLM_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# Server-side speech-to-text (/api/transcribe): one Whisper model shared by every request handler,
+# loaded on the first request
+STT_MODEL = "base"
+STT_WORKERS = 2          # batches decoded in parallel
+STT_BATCH_SIZE = 8       # waiting clips decoded together as one batch
+STT_MAX_QUEUE = 8        # requests waiting beyond this are turned away with a 503
+STT_MAX_SECONDS = 30     # longest audio accepted (decoding stops past this)
+STT_MAX_UPLOAD_MB = 10   # largest request body (Flask answers 413 before reading more)
+STT_TIMEOUT = 60.0       # seconds a request waits for its text
+app.config['MAX_CONTENT_LENGTH'] = STT_MAX_UPLOAD_MB * 1024 * 1024
 
 try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-    conversation_history = []
+    llm = create_gateway(
+        GROQ_API_KEY, GROQ_MODEL,
+        timeout=LLM_TIMEOUT,
+        hedge_after=LLM_HEDGE_AFTER,
+        cache=ResponseCache(LLM_CACHE_FILE, ttl=LLM_CACHE_TTL)
+    )
     
     # JARVIS personality
     jarvis_prompt = """You are JARVIS, the AI assistant from Iron Man. Personality:
@@ -49,10 +74,7 @@ try:
 
 Keep responses SHORT for natural conversation."""
 
-    conversation_history.append({
-        "role": "system",
-        "content": jarvis_prompt
-    })
+    conversation_history = ChatHistory(jarvis_prompt)
     groq_available = True
 except Exception as e:
     print(f"Warning: GROQ API not available: {e}")
@@ -299,32 +321,29 @@ def handle_message():
                 "content": user_message
             })
             
-            try:
-                chat_completion = groq_client.chat.completions.create(
-                    messages=conversation_history,
-                    model=GROQ_MODEL,
-                    temperature=0.7,
-                    max_tokens=200,
-                )
-                
-                ai_response = chat_completion.choices[0].message.content
-                
-                conversation_history.append({
-                    "role": "assistant",
-                    "content": ai_response
-                })
-                
-                return jsonify({
-                    'success': True,
-                    'message': ai_response,
-                    'command_type': 'ai_chat'
-                })
-            except Exception as e:
+            success, ai_response, usage = llm.complete(
+                conversation_history.messages(),
+                temperature=0.7,
+                max_tokens=200,
+            )
+            
+            if not success:
                 return jsonify({
                     'success': False,
-                    'error': f'AI service error: {str(e)}',
-                    'message': "I'm having trouble processing that right now. Please try again."
-                }), 500
+                    'error': f'AI service error (circuit {llm.breaker.state})',
+                    'message': ai_response
+                }), 503
+            
+            conversation_history.append({
+                "role": "assistant",
+                "content": ai_response
+            })
+            
+            return jsonify({
+                'success': True,
+                'message': ai_response,
+                'command_type': 'ai_chat'
+            })
         else:
             return jsonify({
                 'success': False,
@@ -407,6 +426,79 @@ def get_diagnostics():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/llm-stats', methods=['GET'])
+def get_llm_stats():
+    """LLM gateway counters and response cache hit/miss metrics"""
+    if not groq_available:
+        return jsonify({'success': False, 'error': 'AI service not available'}), 503
+    
+    return jsonify({
+        'success': True,
+        'gateway': llm.stats,
+        'circuit': llm.breaker.state,
+        'cache': llm.cache.metrics() if llm.cache else None
+    })
+
+
+@app.route('/api/transcribe', methods=['POST'])
+def transcribe_audio():
+    """Transcribe uploaded audio (multipart field 'audio', or the raw request body)"""
+    upload = request.files.get('audio')
+    if upload is None and not request.content_length:
+        return jsonify({'success': False, 'error': 'No audio provided'}), 400
+    
+    try:
+        audio = decode_audio_file(
+            upload.stream if upload is not None else io.BytesIO(request.get_data()),
+            max_seconds=STT_MAX_SECONDS
+        )
+    except AudioTooLong:
+        return jsonify({'success': False, 'error': f'Audio longer than {STT_MAX_SECONDS} seconds'}), 413
+    except ImportError as e:
+        return jsonify({'success': False, 'error': f'Speech-to-text not available: {e}'}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Could not decode audio: {e}'}), 400
+    
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    if not len(audio):
+        return jsonify({'success': False, 'error': 'Audio is empty'}), 400
+    
+    try:
+        pool = get_worker_pool(
+            model_size=STT_MODEL,
+            workers=STT_WORKERS,
+            batch_size=STT_BATCH_SIZE,
+            max_queue=STT_MAX_QUEUE
+        )
+        text = pool.transcribe(audio, timeout=STT_TIMEOUT)
+    except TranscriptionQueueFull:
+        return jsonify({
+            'success': False,
+            'error': 'Transcription queue is full, please retry shortly'
+        }), 503, {'Retry-After': '2'}
+    except concurrent.futures.TimeoutError:
+        return jsonify({'success': False, 'error': 'Transcription timed out'}), 504
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'text': text,
+        'duration': round(duration, 2)
+    })
+
+
+@app.route('/api/stt-stats', methods=['GET'])
+def get_stt_stats():
+    """Transcription worker pool queue depth and throughput"""
+    pool = get_worker_pool(create=False)
+    return jsonify({
+        'success': True,
+        'loaded': pool is not None,
+        'pool': pool.metrics() if pool is not None else None
+    })
+
+
 @app.route('/api/daily-brief', methods=['GET'])
 def get_daily_brief():
     """Get daily brief statistics"""
@@ -486,10 +578,13 @@ if __name__ == '__main__':
     print("📍 Server: http://localhost:5000")
     print("📚 API Endpoints:")
     print("   - POST /api/message - Send message to JARVIS")
+    print("   - POST /api/transcribe - Transcribe uploaded audio")
     print("   - GET  /api/assignments - Get assignments")
     print("   - GET  /api/diagnostics - Get system diagnostics")
     print("   - GET  /api/daily-brief - Get daily brief stats")
     print("   - GET  /api/study-plans - Get study plans")
+    print("   - GET  /api/llm-stats - LLM gateway and cache metrics")
+    print("   - GET  /api/stt-stats - Transcription queue metrics")
     print("="*60 + "\n")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+JARVIS Audio Buffers
+Preallocated buffers for the always-on audio loops (no per-chunk allocation)
+audio_buffers.py
+"""
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring of audio frames.
+    Incoming chunks are copied into preallocated frame slots and complete
+    frames are handed out as zero-copy views. When the consumer falls behind,
+    memory stays constant: with overflow="overwrite" the oldest frames are
+    overwritten, with overflow="drop" incoming audio is discarded until there
+    is room. Either way the lost frames are counted in dropped_frames.
+    """
+
+    def __init__(self, frame_length, capacity_frames=64, dtype=np.int16, overflow="overwrite"):
+        if overflow not in ("overwrite", "drop"):
+            raise ValueError(f"overflow must be 'overwrite' or 'drop', not {overflow!r}")
+        self.frame_length = frame_length
+        self.capacity = capacity_frames
+        self.overflow = overflow
+        self._frames = np.zeros((capacity_frames, frame_length), dtype=dtype)
+        self._head = 0   # slot of the oldest complete frame
+        self._count = 0  # number of complete frames waiting
+        self._fill = 0   # samples already written into the slot being filled
+        self.dropped_frames = 0
+
+    def __len__(self):
+        """Number of complete frames ready to read"""
+        return self._count
+
+    def write(self, samples):
+        """Copy samples into the ring, overwriting the oldest frames if full"""
+        samples = samples.reshape(-1)
+        total = len(samples)
+        pos = 0
+
+        while pos < total:
+            if self._count == self.capacity:
+                if self.overflow == "drop":
+                    # Consumer is behind: keep what is buffered, discard the rest of this chunk
+                    self.dropped_frames += -(-(total - pos) // self.frame_length)
+                    return
+                # Consumer is behind: drop the oldest frame to make room
+                self._head = (self._head + 1) % self.capacity
+                self._count -= 1
+                self.dropped_frames += 1
+
+            slot = (self._head + self._count) % self.capacity
+            take = min(self.frame_length - self._fill, total - pos)
+            self._frames[slot, self._fill:self._fill + take] = samples[pos:pos + take]
+            self._fill += take
+            pos += take
+
+            if self._fill == self.frame_length:
+                self._count += 1
+                self._fill = 0
+
+    def read_frame(self):
+        """
+        Pop the oldest complete frame.
+        Returns a view into the ring (valid until the slot is overwritten) or None
+        """
+        if self._count == 0:
+            return None
+
+        frame = self._frames[self._head]
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        return frame
+
+    def frames(self):
+        """Complete frames, oldest first, without consuming them (views)"""
+        return [self._frames[(self._head + i) % self.capacity] for i in range(self._count)]
+
+    def clear(self):
+        """Discard everything buffered (O(1), keeps the allocation)"""
+        self._head = 0
+        self._count = 0
+        self._fill = 0
+
+
+class CaptureBuffer:
+    """
+    Preallocated recording buffer for one command.
+    Chunks are written in place and the recorded / spoken regions are
+    returned as views, so nothing is copied between capture and STT.
+    """
+
+    def __init__(self, max_samples, dtype=np.float32):
+        self.max_samples = max_samples
+        self._data = np.zeros(max_samples, dtype=dtype)
+        self._length = 0
+        self.chunks = 0
+        self.speech_start = None  # sample index of the first speech chunk
+        self.speech_end = None    # sample index just past the last speech chunk
+        self._segments = []       # [start, end) of each run of speech chunks
+
+    def __len__(self):
+        """Number of samples recorded"""
+        return self._length
+
+    @property
+    def is_full(self):
+        return self._length >= self.max_samples
+
+    def reset(self):
+        """Start a new recording (keeps the allocation)"""
+        self._length = 0
+        self.chunks = 0
+        self.speech_start = None
+        self.speech_end = None
+        self._segments.clear()
+
+    def append(self, chunk):
+        """
+        Write a chunk in place (int16 chunks are scaled to [-1, 1] on the way in).
+        Returns a view of the written samples, or None if the buffer is full
+        """
+        chunk = chunk.reshape(-1)
+        start = self._length
+        end = min(start + len(chunk), self.max_samples)
+        if end <= start:
+            return None
+
+        if chunk.dtype == np.int16 and self._data.dtype != np.int16:
+            np.multiply(chunk[:end - start], 1.0 / 32768, out=self._data[start:end])
+        else:
+            self._data[start:end] = chunk[:end - start]
+        self._length = end
+        self.chunks += 1
+        return self._data[start:end]
+
+    def mark_speech(self, chunk_length):
+        """Record that the last appended chunk contained speech (extends the current segment)"""
+        start = max(0, self._length - chunk_length)
+        if self._segments and self._segments[-1][1] >= start:
+            self._segments[-1][1] = self._length
+        else:
+            self._segments.append([start, self._length])
+        if self.speech_start is None:
+            self.speech_start = start
+        self.speech_end = self._length
+
+    def speech_segments(self, sample_rate=None):
+        """Speech segments found by the live VAD: (start, end) in samples, or seconds given sample_rate"""
+        if sample_rate:
+            return [(start / sample_rate, end / sample_rate) for start, end in self._segments]
+        return [(start, end) for start, end in self._segments]
+
+    def duration(self, sample_rate):
+        """Recorded duration in seconds"""
+        return self._length / sample_rate
+
+    def view(self):
+        """Everything recorded so far (view)"""
+        return self._data[:self._length]
+
+    def speech_view(self, preroll_samples=0, tail_samples=None):
+        """
+        Spoken region: from just before the first speech chunk to the end (view),
+        or to tail_samples past the last speech chunk.
+        Falls back to the whole recording if no speech was marked
+        """
+        if self.speech_start is None:
+            return self.view()
+        start = max(0, self.speech_start - preroll_samples)
+        end = self._length if tail_samples is None else min(self._length, self.speech_end + tail_samples)
+        return self._data[start:end]
+
+
+if __name__ == "__main__":
+    # Quick self-check
+    ring = FrameRingBuffer(frame_length=4, capacity_frames=3)
+    ring.write(np.arange(10, dtype=np.int16))
+    print(f"Frames ready: {len(ring)} (expected 2)")
+    print(f"First frame: {ring.read_frame()} (expected [0 1 2 3])")
+
+    ring.write(np.arange(10, 30, dtype=np.int16))
+    print(f"Frames ready: {len(ring)}, dropped: {ring.dropped_frames}")
+    while len(ring):
+        print(ring.read_frame())
+
+    ring = FrameRingBuffer(frame_length=4, capacity_frames=2, overflow="drop")
+    ring.write(np.arange(16, dtype=np.int16))
+    print(f"Drop policy keeps {ring.read_frame()} (expected [0 1 2 3]), dropped: {ring.dropped_frames} (expected 2)")
+
+    capture = CaptureBuffer(max_samples=8)
+    capture.append(np.zeros(3, dtype=np.float32))
+    capture.append(np.ones(3, dtype=np.float32))
+    capture.mark_speech(3)
+    print(f"Spoken region: {capture.speech_view()} (expected [1. 1. 1.])")
+    capture.append(np.zeros(1, dtype=np.float32))
+    print(f"Trimmed: {capture.speech_view(tail_samples=0)} (expected [1. 1. 1.]), "
+          f"segments: {capture.speech_segments()} (expected [(3, 6)])")
+    print(f"Append past capacity: {capture.append(np.ones(3, dtype=np.float32))}, full: {capture.is_full}")
\ No newline at end of file
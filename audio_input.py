@@ -0,0 +1,130 @@
+"""
+JARVIS Audio Input
+One always-open microphone stream shared by the wake word detector, the VAD and the recorder
+audio_input.py
+"""
+
+import sys
+import threading
+
+import numpy as np
+import sounddevice as sd
+
+from audio_buffers import FrameRingBuffer
+
+
+class SharedMicrophone:
+    """
+    Single persistent capture stream.
+    The sounddevice callback copies each block into a preallocated frame ring,
+    and whichever stage is active (wake word, VAD/recorder) reads frames in
+    arrival order. Because nothing reopens the device, the frame right after
+    the wake word is the first frame the recorder sees. The last few frames
+    handed out are kept as pre-roll for the start of a command.
+    While no stage listens (a command is being handled), pause() makes the
+    callback discard blocks instead of filling the ring with stale audio.
+    """
+
+    def __init__(self, sample_rate=16000, frame_length=512, buffer_frames=64, preroll_frames=3,
+                 overflow="overwrite"):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self._ring = FrameRingBuffer(frame_length, buffer_frames, overflow=overflow)
+        self._ready = threading.Condition()
+        self._frame = np.zeros(frame_length, dtype=np.int16)
+        self.preroll = FrameRingBuffer(frame_length, preroll_frames)
+        self._stream = None
+        self._paused = False
+        self.paused_frames = 0   # discarded by the callback while paused
+        self.flushed_frames = 0  # buffered but never read (flush/pause)
+
+    def _callback(self, indata, frames, time, status):
+        """sounddevice callback: copy the block into the ring and wake the reader"""
+        if status:
+            print(status, file=sys.stderr)
+        with self._ready:
+            if self._paused:
+                self.paused_frames += max(1, frames // self.frame_length)
+                return
+            self._ring.write(indata)
+            self._ready.notify()
+
+    def open(self):
+        """Open the device once; later calls are no-ops"""
+        if self._stream is None:
+            self._stream = sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=1,
+                dtype='int16',
+                callback=self._callback,
+                blocksize=self.frame_length
+            )
+            self._stream.start()
+
+    def close(self):
+        """Stop and release the device"""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def read(self, timeout=None):
+        """
+        Next frame in arrival order, blocking up to timeout seconds.
+        Returns an int16 array that is reused by the next read, or None on timeout
+        """
+        with self._ready:
+            if not len(self._ring):
+                self._ready.wait(timeout)
+                if not len(self._ring):
+                    return None
+            self._frame[:] = self._ring.read_frame()
+
+        self.preroll.write(self._frame)
+        return self._frame
+
+    def recent_frames(self):
+        """The last frames handed out by read(), oldest first"""
+        return self.preroll.frames()
+
+    def flush(self):
+        """Drop frames that were captured but not read yet (O(1))"""
+        with self._ready:
+            self.flushed_frames += len(self._ring)
+            self._ring.clear()
+
+    def pause(self):
+        """Stop buffering (the stream stays open) and drop what is unread, in O(1)"""
+        with self._ready:
+            self._paused = True
+            self.flushed_frames += len(self._ring)
+            self._ring.clear()
+
+    def resume(self):
+        """Buffer again; the next read returns audio captured after this call"""
+        with self._ready:
+            self.flushed_frames += len(self._ring)
+            self._ring.clear()
+            self._paused = False
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def dropped_frames(self):
+        """Frames lost to overflow because the active stage fell behind"""
+        return self._ring.dropped_frames
+
+    def stats(self):
+        """Frame counters: lost to overflow, discarded while paused, flushed unread, waiting now"""
+        with self._ready:
+            return {"dropped": self._ring.dropped_frames, "paused": self.paused_frames,
+                    "flushed": self.flushed_frames, "buffered": len(self._ring)}
\ No newline at end of file
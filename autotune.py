@@ -0,0 +1,262 @@
+"""
+JARVIS STT Autotune
+Benchmarks Whisper model sizes, compute types, thread counts and beam sizes
+on reference clips, measuring real-time factor and word error rate, and
+writes the fastest configuration that meets the targets to a profile that
+TarsVoiceAssistant loads at startup. Run it once per machine.
+autotune.py
+
+Usage:
+    python autotune.py                                  # built-in reference clips
+    python autotune.py --clips my_clips/ --max-wer 0.1  # name.wav + name.txt pairs
+    python autotune.py --models tiny base --threads 2 4 --beams 1 5 --dry-run
+
+The built-in clips are REFERENCE_SENTENCES spoken by edge-tts, synthesized
+once into ~/.jarvis/autotune_clips (needs network the first time).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import re
+import time
+from datetime import datetime
+
+from speech_to_text import WHISPER_SAMPLE_RATE, SpeechTranscriber, decode_audio_file
+
+DEFAULT_PROFILE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "stt_profile.json")
+CLIP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jarvis", "autotune_clips")
+
+# Typical turns: commands, study questions and open questions.
+# Written the way Whisper transcribes them (numbers as digits), so WER only counts real mistakes
+REFERENCE_SENTENCES = [
+    "Run system diagnostics.",
+    "Turn on focus mode for 45 minutes.",
+    "What assignments do I have due this week?",
+    "Add my physics homework due Friday.",
+    "Help me make a study plan for the chemistry exam.",
+    "Search for the boiling point of water.",
+    "Play the music from Interstellar.",
+    "What is Newton's second law of motion?",
+    "Explain how photosynthesis works in simple terms.",
+    "Who wrote Pride and Prejudice?",
+    "What is the difference between mitosis and meiosis?",
+    "Can you summarize the causes of the French Revolution?",
+]
+REFERENCE_VOICES = ["en-US-GuyNeural", "en-GB-SoniaNeural", "en-US-JennyNeural", "en-IN-PrabhatNeural"]
+
+PROFILE_KEYS = ("model", "device", "compute_type", "cpu_threads", "beam_size")
+
+
+def normalize_words(text):
+    """'Newton's 2nd law!' -> ['newtons', '2nd', 'law']"""
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower().replace("'", "")).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + insertions + deletions) and reference length"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def synthesize_reference_clips(directory=CLIP_CACHE_DIR):
+    """[(path, transcript)] for REFERENCE_SENTENCES, synthesized with edge-tts if not cached"""
+    os.makedirs(directory, exist_ok=True)
+    clips = []
+    missing = []
+    for i, sentence in enumerate(REFERENCE_SENTENCES):
+        voice = REFERENCE_VOICES[i % len(REFERENCE_VOICES)]
+        digest = hashlib.sha1(f"{voice}|{sentence}".encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(directory, f"{digest}.mp3")
+        clips.append((path, sentence))
+        if not os.path.exists(path):
+            missing.append((path, sentence, voice))
+
+    if missing:
+        import edge_tts
+
+        async def save_all():
+            for path, sentence, voice in missing:
+                await edge_tts.Communicate(sentence, voice).save(path + ".part")
+                os.replace(path + ".part", path)
+
+        print(f"Synthesizing {len(missing)} reference clips into {directory}...")
+        asyncio.run(save_all())
+    return clips
+
+
+def load_clip_dir(directory):
+    """[(path, transcript)] for every audio file with a matching .txt"""
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        transcript = os.path.join(directory, stem + ".txt")
+        if ext.lower() != ".txt" and os.path.exists(transcript):
+            with open(transcript, encoding="utf-8") as f:
+                clips.append((os.path.join(directory, name), f.read().strip()))
+    return clips
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def benchmark_config(transcriber, clips, beam_size):
+    """RTF, WER and per-clip decode latency of one configuration"""
+    # Warm-up (first decode allocates buffers)
+    transcriber.transcribe_array(clips[0][0], WHISPER_SAMPLE_RATE, beam_size=beam_size, vad_filter=False)
+
+    latencies = []
+    errors = 0
+    words = 0
+    audio_seconds = 0.0
+    for audio, transcript in clips:
+        start = time.perf_counter()
+        text = transcriber.transcribe_array(audio, WHISPER_SAMPLE_RATE, beam_size=beam_size, vad_filter=False)
+        latencies.append(time.perf_counter() - start)
+        clip_errors, clip_words = word_errors(transcript, text)
+        errors += clip_errors
+        words += clip_words
+        audio_seconds += len(audio) / WHISPER_SAMPLE_RATE
+
+    return {
+        "rtf": sum(latencies) / audio_seconds,
+        "wer": errors / words if words else 0.0,
+        "p50_latency": percentile(latencies, 50),
+        "p90_latency": percentile(latencies, 90),
+    }
+
+
+def run_grid(clips, models, compute_types, threads, beams, device="cpu"):
+    """Every candidate configuration with its measurements (failed loads are skipped)"""
+    results = []
+    for model in models:
+        for compute_type in compute_types:
+            for cpu_threads in threads:
+                try:
+                    transcriber = SpeechTranscriber(model, device=device, compute_type=compute_type,
+                                                    cpu_threads=cpu_threads)
+                except Exception as e:
+                    print(f"  skipping {model}/{compute_type}/{cpu_threads} threads: {e}")
+                    continue
+
+                for beam_size in beams:
+                    config = {"model": model, "device": device, "compute_type": compute_type,
+                              "cpu_threads": cpu_threads, "beam_size": beam_size}
+                    config.update(benchmark_config(transcriber, clips, beam_size))
+                    results.append(config)
+                    print(f"  {model:<8}{compute_type:<9}{cpu_threads:>3} threads  beam {beam_size}  "
+                          f"RTF {config['rtf']:.3f}  WER {config['wer']:.1%}  "
+                          f"p90 {config['p90_latency'] * 1000:.0f} ms")
+                del transcriber
+    return results
+
+
+def choose(results, max_wer, max_latency):
+    """
+    Fastest (lowest RTF) configuration within both targets.
+    If none qualifies: the most accurate one within the latency target,
+    else the fastest overall. Returns (config, meets_targets)
+    """
+    within = [r for r in results if r["wer"] <= max_wer and r["p90_latency"] <= max_latency]
+    if within:
+        return min(within, key=lambda r: r["rtf"]), True
+    fast_enough = [r for r in results if r["p90_latency"] <= max_latency]
+    if fast_enough:
+        return min(fast_enough, key=lambda r: (r["wer"], r["rtf"])), False
+    return min(results, key=lambda r: r["rtf"]), False
+
+
+def save_profile(path, config, meets_targets, targets, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    profile = {key: config[key] for key in PROFILE_KEYS}
+    profile.update({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": {"cpus": os.cpu_count(), "machine": platform.machine(), "processor": platform.processor()},
+        "meets_targets": meets_targets,
+        "targets": targets,
+        "measured": {key: config[key] for key in ("rtf", "wer", "p50_latency", "p90_latency")},
+        "candidates": results,
+    })
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def load_profile(path=DEFAULT_PROFILE_FILE):
+    """
+    Whisper settings {model, device, compute_type, cpu_threads, beam_size} from an
+    autotune profile, or None if there is none (or it was tuned on different hardware)
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+        settings = {key: profile[key] for key in PROFILE_KEYS}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️  Ignoring STT profile {path}: {e}")
+        return None
+
+    cpus = profile.get("host", {}).get("cpus")
+    if cpus != os.cpu_count():
+        print(f"⚠️  Ignoring STT profile {path}: tuned on {cpus} CPUs, this machine has {os.cpu_count()} "
+              f"(re-run python autotune.py)")
+        return None
+    return settings
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Find the fastest Whisper settings for this machine")
+    parser.add_argument("--clips", help="directory of audio files with matching .txt transcripts, numbers "
+                                        "written as digits (default: built-in reference sentences)")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    parser.add_argument("--threads", nargs="+", type=int,
+                        default=sorted({n for n in (1, 2, 4, cpus) if n <= cpus}))
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 5])
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--max-wer", type=float, default=0.10, help="word error rate target (0.10 = 10%%)")
+    parser.add_argument("--max-latency", type=float, default=1.5,
+                        help="p90 seconds to decode one clip")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE_FILE, help="where to write the profile")
+    parser.add_argument("--dry-run", action="store_true", help="report the choice without writing it")
+    args = parser.parse_args()
+
+    sources = load_clip_dir(args.clips) if args.clips else synthesize_reference_clips()
+    if not sources:
+        parser.error(f"no clips with transcripts in {args.clips}")
+    clips = [(decode_audio_file(path), transcript) for path, transcript in sources]
+    total = sum(len(audio) for audio, _ in clips) / WHISPER_SAMPLE_RATE
+    print(f"{len(clips)} reference clips ({total:.1f}s), {cpus} CPUs")
+
+    results = run_grid(clips, args.models, args.compute_types, args.threads, args.beams, args.device)
+    if not results:
+        parser.error("no configuration could be loaded")
+
+    targets = {"max_wer": args.max_wer, "max_latency": args.max_latency}
+    best, meets_targets = choose(results, args.max_wer, args.max_latency)
+    print(f"\n{'Best' if meets_targets else 'No configuration meets the targets; closest'}: "
+          f"{best['model']} {best['compute_type']}, {best['cpu_threads']} threads, beam {best['beam_size']} "
+          f"(RTF {best['rtf']:.3f}, WER {best['wer']:.1%}, p90 {best['p90_latency'] * 1000:.0f} ms)")
+
+    if not args.dry_run:
+        save_profile(args.profile, best, meets_targets, targets, results)
+        print(f"✓ Profile written to {args.profile} (loaded by main.py at startup)")
+
+
+if __name__ == "__main__":
+    main()
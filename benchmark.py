@@ -0,0 +1,631 @@
+"""
+JARVIS Replay Benchmark
+Feeds recorded WAV files through the real wake word -> VAD -> Whisper ->
+check_command/LLM -> TTS path of TarsVoiceAssistant, with stand-ins for the
+microphone (sounddevice), the speakers (pygame.mixer), Groq and edge-tts,
+and reports per-stage latency percentiles and CPU time per turn.
+benchmark.py
+
+Usage:
+    python benchmark.py turns/*.wav --runs 3
+    python benchmark.py turns/*.wav --set WHISPER_MODEL='"tiny"' --set STREAMING_STT=False
+    python benchmark.py turns/*.wav --llm-latency 0.6 --tts-latency 0.3 --json results.json
+
+Each WAV is one turn. Without --picovoice-key the wake word "fires" at
+--wake-at seconds into the clip (default 0: the clip is just the command);
+with a key the real Porcupine engine listens and clips must start with "Jarvis".
+"""
+
+import argparse
+import ast
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from functools import partial
+
+import numpy as np
+
+import tracing
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+TAIL_SILENCE = 2.0  # seconds of room noise after each clip so the VAD can endpoint
+
+
+# ==================== MICROPHONE STAND-IN ====================
+
+class ReplaySource:
+    """
+    Plays clips into the fake microphone in real time (or speed x faster).
+    Between clips it delivers quiet room noise, like an idle microphone
+    """
+
+    def __init__(self, speed=1.0, noise_level=30, seed=0):
+        self.speed = speed
+        self.noise_level = noise_level
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._clip = None
+        self._position = 0
+        self._speech_samples = 0
+        self.clip_id = 0
+        self.clip_started = None   # perf_counter when the clip's first block went out
+        self.speech_ended = None   # perf_counter when its last non-tail block went out
+
+    def play(self, samples, tail_samples):
+        """Queue an int16 clip (followed by tail_samples of noise)"""
+        self._idle.wait()
+        tail = (self._rng.standard_normal(tail_samples) * self.noise_level).astype(np.int16)
+        with self._lock:
+            self._clip = np.concatenate([samples, tail])
+            self._speech_samples = len(samples)
+            self._position = 0
+            self.clip_id += 1
+            self.clip_started = None
+            self.speech_ended = None
+            self._idle.clear()
+
+    @property
+    def clip_position(self):
+        """Samples of the current clip delivered so far"""
+        with self._lock:
+            return self._position
+
+    def wait_idle(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def next_block(self, frames):
+        with self._lock:
+            if self._clip is None:
+                return (self._rng.standard_normal(frames) * self.noise_level).astype(np.int16)
+
+            if self._position == 0:
+                self.clip_started = time.perf_counter()
+            block = self._clip[self._position:self._position + frames]
+            self._position += len(block)
+
+            if self.speech_ended is None and self._position >= self._speech_samples:
+                self.speech_ended = time.perf_counter()
+            if self._position >= len(self._clip):
+                self._clip = None
+                self._idle.set()
+
+        if len(block) < frames:
+            block = np.pad(block, (0, frames - len(block)))
+        return block
+
+
+class ReplayInputStream:
+    """sounddevice.InputStream stand-in driven by a ReplaySource"""
+
+    def __init__(self, source, samplerate, channels, dtype, callback, blocksize):
+        self.source = source
+        self.samplerate = samplerate
+        self.callback = callback
+        self.blocksize = blocksize
+        self._running = False
+        self._thread = None
+
+    def _run(self):
+        interval = self.blocksize / self.samplerate / self.source.speed
+        next_time = time.perf_counter()
+        while self._running:
+            block = self.source.next_block(self.blocksize)
+            self.callback(block.reshape(-1, 1), self.blocksize, None, None)
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="replay-mic", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+def make_sounddevice(source):
+    module = types.ModuleType("sounddevice")
+    module.InputStream = partial(ReplayInputStream, source)
+    return module
+
+
+# ==================== SPEAKER STAND-IN ====================
+
+class NullSound:
+    MUSIC_LENGTH = 120.0  # stand-in length of a track loaded from a file
+
+    def __init__(self, mixer, file=None, buffer=None):
+        self._mixer = mixer
+        if buffer is None:
+            self._length = self.MUSIC_LENGTH
+            return
+        frequency, size, channels = mixer.get_init()
+        # Replayed faster than real time, audio "plays" faster too
+        self._length = len(buffer) / (frequency * channels * abs(size) // 8) / mixer.speed
+
+    def get_length(self):
+        return self._length
+
+    def play(self):
+        return self._mixer._play(self)
+
+
+class NullChannel:
+    """Tracks when queued audio would finish, without an audio device"""
+
+    def __init__(self):
+        self._ends = 0.0
+        self._queued = None
+        self._volume = 1.0
+
+    def _update(self):
+        now = time.monotonic()
+        if self._queued is not None and now >= self._ends:
+            self._ends = max(self._ends, now) + self._queued.get_length()
+            self._queued = None
+        return now
+
+    def _start(self, sound):
+        self._ends = time.monotonic() + sound.get_length()
+        self._queued = None
+
+    def get_busy(self):
+        return self._update() < self._ends
+
+    def get_queue(self):
+        self._update()
+        return self._queued
+
+    def queue(self, sound):
+        if not self.get_busy():
+            self._start(sound)
+        else:
+            self._queued = sound
+
+    def play(self, sound, loops=0):
+        self._start(sound)
+
+    def stop(self):
+        self._ends = 0.0
+        self._queued = None
+
+    def fadeout(self, ms):
+        self.stop()
+
+    def set_volume(self, volume):
+        self._volume = volume
+
+    def get_volume(self):
+        return self._volume
+
+
+class NullMusic:
+    def __init__(self):
+        self._playing = False
+
+    def load(self, path):
+        pass
+
+    def play(self, loops=0):
+        self._playing = True
+
+    def stop(self):
+        self._playing = False
+
+    def pause(self):
+        pass
+
+    def unpause(self):
+        pass
+
+    def get_busy(self):
+        return self._playing
+
+
+class NullMixer:
+    """pygame.mixer stand-in: Sounds 'play' for their real duration, silently"""
+
+    def __init__(self, speed=1.0, frequency=44100, channels=8):
+        self.speed = speed
+        self._format = (frequency, -16, 2)
+        self._channels = [NullChannel() for _ in range(channels)]
+        self._reserved = 0
+        self.music = NullMusic()
+        self.plays = []  # perf_counter of every Sound.play()
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def quit(self):
+        pass
+
+    def get_init(self):
+        return self._format
+
+    def Sound(self, file=None, buffer=None):
+        return NullSound(self, file, buffer)
+
+    def Channel(self, channel_id):
+        return self._channels[channel_id]
+
+    def set_reserved(self, count):
+        self._reserved = count
+
+    def _play(self, sound):
+        for channel in self._channels[self._reserved:]:
+            if not channel.get_busy():
+                channel._start(sound)
+                self.plays.append(time.perf_counter())
+                return channel
+        return None
+
+    def first_play_after(self, start):
+        """perf_counter of the first Sound played at or after start"""
+        first = None
+        for played in reversed(self.plays):
+            if played < start:
+                break
+            first = played
+        return first
+
+
+# ==================== EDGE-TTS STAND-IN ====================
+
+def encode_mp3(seconds, rate=24000):
+    """A quiet tone as MP3 bytes (what edge-tts would stream)"""
+    import av
+
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="mp3") as output:
+        stream = output.add_stream("mp3", rate=rate, layout="mono")
+        t = np.arange(int(seconds * rate)) / rate
+        frame = av.AudioFrame.from_ndarray(
+            (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32).reshape(1, -1),
+            format="fltp", layout="mono"
+        )
+        frame.rate = rate
+        for packet in stream.encode(frame):
+            output.mux(packet)
+        for packet in stream.encode(None):
+            output.mux(packet)
+    return buffer.getvalue()
+
+
+class StubCommunicate:
+    def __init__(self, tts, text):
+        self.tts = tts
+        self.text = text
+
+    async def stream(self):
+        tts = self.tts
+        await asyncio.sleep(tts.first_chunk_latency)
+
+        seconds = max(1, round(len(self.text) / tts.chars_per_second))
+        data = tts.mp3_second * seconds
+        chunk_size = 4096
+        delay = chunk_size / len(data) * seconds / tts.synthesis_speed
+
+        for start in range(0, len(data), chunk_size):
+            yield {"type": "audio", "data": data[start:start + chunk_size]}
+            await asyncio.sleep(delay)
+
+
+def make_edge_tts(first_chunk_latency=0.2, chars_per_second=15, synthesis_speed=5.0):
+    """edge_tts stand-in: audio length follows the text, arriving faster than real time"""
+    module = types.ModuleType("edge_tts")
+    module.first_chunk_latency = first_chunk_latency
+    module.chars_per_second = chars_per_second
+    module.synthesis_speed = synthesis_speed
+    module.mp3_second = encode_mp3(1.0)
+    module.Communicate = lambda text, voice, rate=None: StubCommunicate(module, text)
+    return module
+
+
+# ==================== WAKE WORD STAND-IN ====================
+
+class ScriptedWakeWord:
+    """Porcupine stand-in that fires once per clip, wake_at seconds into it"""
+
+    sample_rate = SAMPLE_RATE
+    frame_length = FRAME_LENGTH
+
+    def __init__(self, source, wake_at=0.0):
+        self.source = source
+        self.wake_samples = int(wake_at * SAMPLE_RATE)
+        self._fired_clip = 0
+
+    def process(self, frame):
+        source = self.source
+        if source.clip_id != self._fired_clip and source.clip_started is not None \
+                and source.clip_position > self.wake_samples:
+            self._fired_clip = source.clip_id
+            return 0
+        return -1
+
+    def delete(self):
+        pass
+
+
+def make_pvporcupine(source, wake_at):
+    module = types.ModuleType("pvporcupine")
+    module.create = lambda access_key=None, keywords=None, **kwargs: ScriptedWakeWord(source, wake_at)
+    return module
+
+
+# ==================== MEASUREMENT ====================
+
+def load_wav(path):
+    """A WAV file as mono int16 at 16kHz"""
+    from speech_to_text import to_whisper_audio
+
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        rate = f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        samples = samples.reshape(-1, f.getnchannels())
+
+    audio = to_whisper_audio(samples, rate)  # float32 mono 16kHz
+    return np.clip(audio * 32768.0, -32768, 32767).astype(np.int16)
+
+
+class TurnRecorder:
+    """Times the assistant's stages by wrapping its methods"""
+
+    def __init__(self):
+        self.turn = None
+        self.turns = []
+
+    def begin(self, clip, run):
+        self.turn = {"clip": clip, "run": run, "stages": {}}
+        self.turns.append(self.turn)
+        return self.turn
+
+    def add(self, stage, seconds):
+        if self.turn is not None:
+            stages = self.turn["stages"]
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def wrap(self, obj, name, stage, keep_result=None):
+        original = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+                if keep_result and self.turn is not None:
+                    self.turn[keep_result] = result
+                return result
+            finally:
+                self.add(stage, time.perf_counter() - start)
+                if self.turn is not None:
+                    self.turn.setdefault("ended", {})[stage] = time.perf_counter()
+
+        setattr(obj, name, timed)
+
+    def wrap_future(self, obj, name, stage):
+        """
+        Time a method that returns a Future (e.g. say()): the stage runs from the
+        turn's first call until the last of its Futures resolves
+        """
+        original = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            future = original(*args, **kwargs)
+            if self.turn is not None:
+                span = self.turn.setdefault("spans", {}).setdefault(stage, [time.perf_counter(), None])
+                future.add_done_callback(lambda _: span.__setitem__(1, time.perf_counter()))
+            return future
+
+        setattr(obj, name, timed)
+
+    def close_spans(self):
+        """Turn wrap_future() spans into stages (call once the turn's Futures are done)"""
+        if self.turn is not None:
+            for stage, (start, end) in self.turn.pop("spans", {}).items():
+                if end is not None:
+                    self.add(stage, end - start)
+
+
+def instrument(jarvis, recorder):
+    recorder.wrap(jarvis, "listen_for_command_vad", "capture_stt", keep_result="transcript")
+    recorder.wrap(jarvis, "get_ai_response", "llm")
+    recorder.wrap(jarvis, "get_ai_response_streaming", "llm")
+    recorder.wrap(jarvis, "speak", "speak")
+    # Replies are queued with say() and play after process_command returns
+    recorder.wrap_future(jarvis, "say", "speak")
+    controller = jarvis.system_controller
+    recorder.wrap(controller, "check_command", "intent")
+    recorder.wrap(controller, "execute_command", "execute")
+
+
+def percentile_table(turns):
+    """{stage: {p50, p90, p99, mean, n}} over all measured turns"""
+    samples = {}
+    for turn in turns:
+        for stage, seconds in turn["stages"].items():
+            samples.setdefault(stage, []).append(seconds)
+
+    table = {}
+    for stage, values in samples.items():
+        values = np.array(values) * 1000
+        table[stage] = {
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)),
+            "mean": float(values.mean()),
+            "n": len(values),
+        }
+    return table
+
+
+def print_table(table):
+    print(f"\n{'stage':<18}{'p50':>9}{'p90':>9}{'p99':>9}{'mean':>9}{'n':>5}   (ms)")
+    order = ["wake", "capture_stt", "after_speech", "intent", "execute", "llm",
+             "first_audio", "speak", "turn", "cpu"]
+    for stage in sorted(table, key=lambda s: order.index(s) if s in order else len(order)):
+        row = table[stage]
+        print(f"{stage:<18}{row['p50']:>9.0f}{row['p90']:>9.0f}{row['p99']:>9.0f}"
+              f"{row['mean']:>9.0f}{row['n']:>5}")
+
+
+# ==================== HARNESS ====================
+
+def install_stand_ins(args, source):
+    """Replace the device/network dependencies before main.py is imported"""
+    sys.modules["sounddevice"] = make_sounddevice(source)
+
+    if not args.live_tts:
+        sys.modules["edge_tts"] = make_edge_tts(
+            first_chunk_latency=args.tts_latency,
+            synthesis_speed=args.tts_speed
+        )
+
+    if not args.picovoice_key:
+        sys.modules["pvporcupine"] = make_pvporcupine(source, args.wake_at)
+
+    import pygame
+    mixer = NullMixer(speed=args.speed)
+    pygame.mixer = mixer
+    return mixer
+
+
+def build_assistant(args, source):
+    mixer = install_stand_ins(args, source)
+
+    import main
+    from llm_gateway import create_gateway, LocalBackend
+
+    main.PICOVOICE_ACCESS_KEY = args.picovoice_key or "replay"
+    main.TTS_CACHE_DIR = args.tts_cache or tempfile.mkdtemp(prefix="jarvis-bench-tts-")
+    # Keep benchmark turns out of the assistant's own trace log
+    main.TRACE_FILE = os.path.join(tempfile.mkdtemp(prefix="jarvis-bench-trace-"), "traces.jsonl")
+    main.LLM_CACHE_FILE = args.llm_cache or None  # default: memory only, fresh per run
+    if not args.live_llm:
+        backend = LocalBackend(latency=args.llm_latency, token_interval=args.llm_token_interval)
+        main.create_gateway = partial(create_gateway, backend=backend)
+
+    for setting in args.set:
+        name, value = setting.split("=", 1)
+        if not hasattr(main, name):
+            raise SystemExit(f"Unknown setting: {name}")
+        setattr(main, name, ast.literal_eval(value))
+
+    jarvis = main.TarsVoiceAssistant()
+    jarvis.components.wait_all()  # load time is reported separately, not charged to turn 1
+    return main, jarvis, mixer
+
+
+def run_turn(jarvis, source, mixer, recorder, clip, samples, run, speed):
+    turn = recorder.begin(clip, run)
+    source.play(samples, int(TAIL_SILENCE * SAMPLE_RATE))
+
+    clip_seconds = len(samples) / SAMPLE_RATE / speed
+    if not jarvis.wait_for_wake_word(timeout=clip_seconds + TAIL_SILENCE + 5):
+        turn["error"] = "wake word not detected"
+        source.wait_idle()
+        return turn
+
+    woke = time.perf_counter()
+    turn["stages"]["wake"] = woke - source.clip_started
+
+    cpu = time.process_time()
+    jarvis.process_command()
+    # Replies keep playing after process_command returns (barge-in); a turn ends with playback
+    while jarvis.speech_worker.is_busy():
+        time.sleep(0.005)
+    done = time.perf_counter()
+    recorder.close_spans()
+    turn["stages"]["cpu"] = time.process_time() - cpu
+    turn["stages"]["turn"] = done - woke
+
+    # User-perceived latencies, measured from the end of the clip's audio
+    speech_ended = source.speech_ended
+    captured = turn.get("ended", {}).get("capture_stt")
+    if speech_ended is not None and captured is not None:
+        turn["stages"]["after_speech"] = captured - speech_ended
+    first_audio = mixer.first_play_after(woke)
+    if speech_ended is not None and first_audio is not None:
+        turn["stages"]["first_audio"] = first_audio - speech_ended
+    turn.pop("ended", None)
+
+    jarvis.microphone.flush()
+    source.wait_idle()
+    return turn
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Replay WAV files through the JARVIS voice pipeline")
+    parser.add_argument("clips", nargs="+", help="16-bit PCM WAV files, one turn each")
+    parser.add_argument("--runs", type=int, default=1, help="passes over the clip list")
+    parser.add_argument("--warmup", type=int, default=1, help="leading turns excluded from the stats")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (1.0 = real time)")
+    parser.add_argument("--wake-at", type=float, default=0.0, help="seconds into each clip the wake word fires")
+    parser.add_argument("--picovoice-key", help="use the real Porcupine engine")
+    parser.add_argument("--live-llm", action="store_true", help="call Groq instead of the local stand-in")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="stand-in LLM time to first token")
+    parser.add_argument("--llm-token-interval", type=float, default=0.01)
+    parser.add_argument("--llm-cache", help="LLM response cache file (default: in-memory, starts empty)")
+    parser.add_argument("--live-tts", action="store_true", help="call edge-tts instead of the stand-in")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="stand-in TTS time to first chunk")
+    parser.add_argument("--tts-speed", type=float, default=5.0, help="stand-in synthesis speed (x real time)")
+    parser.add_argument("--tts-cache", help="TTS cache directory (default: a fresh temp dir)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a main.py setting, e.g. WHISPER_MODEL='\"tiny\"'")
+    parser.add_argument("--json", help="write turns and stats to this file")
+    args = parser.parse_args()
+
+    source = ReplaySource(speed=args.speed)
+    clips = [(path, load_wav(path)) for path in args.clips]
+    main, jarvis, mixer = build_assistant(args, source)
+    startup = jarvis.components.report()
+
+    recorder = TurnRecorder()
+    instrument(jarvis, recorder)
+
+    jarvis.is_running = True
+    with jarvis.microphone:
+        for run in range(args.runs):
+            for path, samples in clips:
+                turn = run_turn(jarvis, source, mixer, recorder, path, samples, run, args.speed)
+                print(f"⏱️  {path}: {turn.get('transcript') or turn.get('error', '')!r} "
+                      f"({turn['stages'].get('turn', 0):.2f}s)")
+
+    jarvis.is_running = False
+    jarvis.speech_worker.close()
+
+    measured = [turn for turn in recorder.turns[args.warmup:] if "error" not in turn]
+    table = percentile_table(measured)
+    print_table(table)
+
+    # The assistant's own stage trace (tracing.py), same turns
+    traces = tracing.load_records(jarvis.tracer.path)[args.warmup:]
+    print()
+    tracing.print_summary(traces)
+    print(f"\n{len(measured)} turns measured, "
+          f"{sum(1 for turn in recorder.turns if 'error' in turn)} failed, "
+          f"startup {startup['elapsed']:.2f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "startup": startup, "stats": table,
+                       "trace_stats": tracing.summarize(traces), "turns": recorder.turns}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
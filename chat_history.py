@@ -0,0 +1,116 @@
+"""
+JARVIS Chat History
+Token-budgeted conversation history for the LLM
+chat_history.py
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+class ChatHistory:
+    """
+    Conversation history sent to the LLM on every request.
+    The system prompt and the most recent turns always go out; once the
+    prompt would exceed the token budget, older turns are dropped, or folded
+    into a rolling summary when a summarizer is given.
+    """
+
+    MESSAGE_OVERHEAD = 4  # tokens for role/formatting per message
+
+    def __init__(self, system_prompt, max_prompt_tokens=1500, keep_recent_turns=3, summarizer=None):
+        self.system_prompt = system_prompt
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent_turns = keep_recent_turns  # user+assistant pairs that are never dropped
+        self.summarizer = summarizer                # fn(previous_summary, dropped_messages) -> summary
+        self.summary = ""
+        self.turns = []
+        self.dropped_messages = 0
+        self.last_estimated_tokens = 0
+        self.last_prompt_tokens = None
+
+    def append(self, message):
+        """Add a {"role": ..., "content": ...} message (system messages replace the prompt)"""
+        if message["role"] == "system":
+            self.system_prompt = message["content"]
+        else:
+            self.turns.append(message)
+
+    def __len__(self):
+        return len(self.turns) + 1
+
+    def _system_message(self):
+        content = self.system_prompt
+        if self.summary:
+            content += f"\n\nSummary of the earlier conversation: {self.summary}"
+        return {"role": "system", "content": content}
+
+    def _cost(self, message):
+        return estimate_tokens(message["content"]) + self.MESSAGE_OVERHEAD
+
+    def _trim(self, system):
+        """Drop the oldest turns until the prompt fits; returns what was dropped"""
+        total = self._cost(system) + sum(self._cost(m) for m in self.turns)
+        dropped = []
+
+        # Everything from the keep_recent_turns-th last question onwards stays
+        protected = len(self.turns)
+        questions = 0
+        while protected > 0 and questions < self.keep_recent_turns:
+            protected -= 1
+            if self.turns[protected]["role"] == "user":
+                questions += 1
+
+        while total > self.max_prompt_tokens and protected > 0:
+            # Whole turns only: a question goes together with every reply up to the next
+            # question, so the kept history never starts with an orphaned answer
+            end = 1
+            while end < protected and self.turns[end]["role"] != "user":
+                end += 1
+            for message in self.turns[:end]:
+                dropped.append(message)
+                total -= self._cost(message)
+            del self.turns[:end]
+            protected -= end
+
+        self.dropped_messages += len(dropped)
+        self.last_estimated_tokens = total
+        return dropped
+
+    def messages(self):
+        """Messages for the next request, trimmed to the token budget"""
+        system = self._system_message()
+        dropped = self._trim(system)
+
+        if dropped and self.summarizer:
+            try:
+                self.summary = self.summarizer(self.summary, dropped)
+            except Exception as e:
+                print(f"History summary failed: {e}")
+            # The summary itself takes room; trim again around it
+            system = self._system_message()
+            self._trim(system)
+
+        return [system] + self.turns
+
+    def record_usage(self, usage):
+        """Store the prompt token count reported by the API (if any)"""
+        prompt_tokens = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        self.last_prompt_tokens = prompt_tokens
+        shown = prompt_tokens if prompt_tokens is not None else f"~{self.last_estimated_tokens}"
+        print(f"📏 Prompt: {shown} tokens ({len(self.turns)} messages kept, {self.dropped_messages} dropped so far)")
+        return prompt_tokens
+
+
+if __name__ == "__main__":
+    # Quick self-check
+    history = ChatHistory("You are JARVIS.", max_prompt_tokens=60, keep_recent_turns=1,
+                          summarizer=lambda summary, dropped: f"{len(dropped)} older messages")
+    for i in range(5):
+        history.append({"role": "user", "content": f"Question number {i} about physics homework"})
+        history.append({"role": "assistant", "content": f"Answer number {i}, sir."})
+        messages = history.messages()
+        print(f"Turn {i}: {len(messages)} messages, ~{history.last_estimated_tokens} tokens")
+    print(messages[0]["content"])
\ No newline at end of file
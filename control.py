@@ -5,9 +5,63 @@ control.py
 """
 
 import psutil  # pip install psutil
+import re
 import webbrowser
 import urllib.parse
-from education import EducationAssistant
+from education import EducationAssistant, EDUCATION_PHRASES
+from intent_matcher import PhraseMatcher
+
+# check_command triggers (substrings of the lowercased text); see check_command for priorities
+SEARCH_TRIGGERS = [
+    "search for ",
+    "search ",
+    "google ",
+    "look up ",
+    "find information about ",
+    "search the web for "
+]
+
+CONTROL_PHRASES = {
+    "diagnostics": [
+        "system diagnostics",
+        "system diagnostic",
+        "run diagnostics",
+        "system status",
+        "system check",
+        "check system",
+        "system report",
+        "system info",
+        "system information"
+    ],
+    "focus_start": [
+        "turn on focus mode", "start focus mode", "enable focus mode",
+        "activate focus mode", "begin focus mode", "start focus",
+        "turn on focus", "enable focus", "start study timer"
+    ],
+    "focus_stop": [
+        "turn off focus mode", "stop focus mode", "disable focus mode",
+        "deactivate focus mode", "end focus mode", "stop focus",
+        "turn off focus", "disable focus", "stop study timer"
+    ],
+    "focus_pause": ["pause focus mode", "pause focus", "pause timer", "pause study timer"],
+    "focus_resume": [
+        "resume focus mode", "resume focus", "resume timer",
+        "resume study timer", "continue focus mode"
+    ],
+    "focus_extend": [
+        "extend focus mode", "extend focus", "extend timer",
+        "add time", "extend study timer"
+    ],
+    "unit_hours": ["hour", "hr"],
+    "music_play": ["play music", "play the music", "start music", "play song"],
+    "music_stop": ["stop music", "stop the music", "pause music", "stop song"],
+    "oppenheimer": ["oppenheimer"],
+    "search": SEARCH_TRIGGERS,
+}
+
+# Education and system phrases share one matcher, so each utterance is scanned once
+INTENTS = PhraseMatcher({**EDUCATION_PHRASES, **CONTROL_PHRASES})
+_NUMBER = re.compile(r"\d+")
 
 
 class SystemController:
@@ -173,130 +227,49 @@ class SystemController:
         Priority: Education > System > Search
         """
         text_lower = text.lower()
+        matches = INTENTS.match(text_lower)
         
         # PRIORITY 1: Check Education Commands First
-        edu_cmd, edu_details = self.education.check_command(text)
+        edu_cmd, edu_details = self.education.check_command(text, matches)
         if edu_cmd:
             return edu_cmd, edu_details
         
         # PRIORITY 2: System Diagnostics
-        if any(phrase in text_lower for phrase in [
-            "system diagnostics",
-            "system diagnostic",
-            "run diagnostics",
-            "system status",
-            "system check",
-            "check system",
-            "system report",
-            "system info",
-            "system information"
-        ]):
+        if "diagnostics" in matches:
             return "diagnostics", None
         
         # PRIORITY 3: Focus Mode Commands
-        focus_keywords = ["focus mode", "focus", "focus timer", "study timer", "pomodoro"]
-        
-        # Turn on focus mode
-        if any(phrase in text_lower for phrase in [
-            "turn on focus mode", "start focus mode", "enable focus mode",
-            "activate focus mode", "begin focus mode", "start focus",
-            "turn on focus", "enable focus", "start study timer"
-        ]):
-            # Try to extract duration (e.g., "30 minutes", "1 hour")
-            duration = None
-            import re
-            numbers = re.findall(r'\d+', text_lower)
-            if numbers:
-                num = int(numbers[0])
-                if "hour" in text_lower or "hr" in text_lower:
-                    duration = num * 60  # Convert to minutes
-                elif "minute" in text_lower or "min" in text_lower:
-                    duration = num
-                else:
-                    duration = num  # Default to minutes
-            else:
-                duration = 25  # Default 25 minutes (Pomodoro)
-            
-            return "focus_mode_start", {"duration": duration}
+        if "focus_start" in matches:
+            # e.g. "30 minutes", "1 hour"; default 25 minutes (Pomodoro)
+            return "focus_mode_start", {"duration": self._minutes(text_lower, matches, default=25)}
         
-        # Turn off/stop focus mode
-        if any(phrase in text_lower for phrase in [
-            "turn off focus mode", "stop focus mode", "disable focus mode",
-            "deactivate focus mode", "end focus mode", "stop focus",
-            "turn off focus", "disable focus", "stop study timer"
-        ]):
+        if "focus_stop" in matches:
             return "focus_mode_stop", None
         
-        # Pause focus mode
-        if any(phrase in text_lower for phrase in [
-            "pause focus mode", "pause focus", "pause timer",
-            "pause study timer"
-        ]):
+        if "focus_pause" in matches:
             return "focus_mode_pause", None
         
-        # Resume focus mode
-        if any(phrase in text_lower for phrase in [
-            "resume focus mode", "resume focus", "resume timer",
-            "resume study timer", "continue focus mode"
-        ]):
+        if "focus_resume" in matches:
             return "focus_mode_resume", None
         
-        # Extend focus mode
-        if any(phrase in text_lower for phrase in [
-            "extend focus mode", "extend focus", "extend timer",
-            "add time", "extend study timer"
-        ]):
-            # Try to extract extension duration
-            extension = 15  # Default 15 minutes
-            import re
-            numbers = re.findall(r'\d+', text_lower)
-            if numbers:
-                num = int(numbers[0])
-                if "hour" in text_lower or "hr" in text_lower:
-                    extension = num * 60
-                elif "minute" in text_lower or "min" in text_lower:
-                    extension = num
-                else:
-                    extension = num
-            
-            return "focus_mode_extend", {"minutes": extension}
+        if "focus_extend" in matches:
+            return "focus_mode_extend", {"minutes": self._minutes(text_lower, matches, default=15)}
         
         # PRIORITY 4: Music Commands
-        music_keywords = ["music", "song", "play", "stop"]
-        
-        # Play music
-        if any(phrase in text_lower for phrase in [
-            "play music", "play the music", "start music", "play song"
-        ]):
-            # Try to detect which song
-            music_file = "cornfieldchase.mp3"  # Default
-            if "oppenheimer" in text_lower:
-                music_file = "oppenheimer.mp3"
-            elif "cornfield" in text_lower or "cornfield chase" in text_lower:
-                music_file = "cornfieldchase.mp3"
-            
+        if "music_play" in matches:
+            # Try to detect which song (default: Cornfield Chase)
+            music_file = "oppenheimer.mp3" if "oppenheimer" in matches else "cornfieldchase.mp3"
             return "music_play", {"file": music_file}
         
-        # Stop music
-        if any(phrase in text_lower for phrase in [
-            "stop music", "stop the music", "pause music", "stop song"
-        ]):
+        if "music_stop" in matches:
             return "music_stop", None
         
-        # PRIORITY 5: Web Search
-        search_triggers = [
-            "search for ",
-            "search ",
-            "google ",
-            "look up ",
-            "find information about ",
-            "search the web for "
-        ]
-        
-        for trigger in search_triggers:
-            if trigger in text_lower:
-                # Extract search query after trigger
-                idx = text_lower.find(trigger)
+        # PRIORITY 5: Web Search (triggers in list order, query after the first occurrence)
+        if "search" in matches:
+            for trigger in SEARCH_TRIGGERS:
+                idx = matches.phrases.get(trigger)
+                if idx is None:
+                    continue
                 query = text[idx + len(trigger):].strip()
                 
                 # Remove common stop words at the end
@@ -309,6 +282,15 @@ class SystemController:
         
         return None, None
     
+    @staticmethod
+    def _minutes(text_lower, matches, default):
+        """First number in the text, in minutes (hours converted); default if there is none"""
+        number = _NUMBER.search(text_lower)
+        if number is None:
+            return default
+        num = int(number.group())
+        return num * 60 if "unit_hours" in matches else num
+    
     def execute_command(self, command_type, details=None):
         """
         Execute any command (system, education, or search)
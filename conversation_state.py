@@ -5,6 +5,20 @@ Handles multi-turn conversations with wake word between each exchange
 
 
 class ConversationState:
+    # Questions asked for each missing field, per conversation type
+    QUESTIONS = {
+        'add_assignment': {
+            'course': "What course is it for?",
+            'description': "What's the assignment about?",
+            'due_date': "When is it due?"
+        },
+        'create_study_plan': {
+            'subject': "What subject is the exam on?",
+            'exam_date': "When is the exam?",
+            'hours_per_day': "How many hours per day can you study?"
+        }
+    }
+    
     def __init__(self):
         self.active = False
         self.context_type = None  # 'add_assignment' or 'create_study_plan'
@@ -46,23 +60,8 @@ class ConversationState:
     
     def get_question(self):
         """Get the question to ask based on next_field"""
-        if self.context_type == 'add_assignment':
-            questions = {
-                'course': "What course is it for?",
-                'description': "What's the assignment about?",
-                'due_date': "When is it due?"
-            }
-            return questions.get(self.next_field, "")
-        
-        elif self.context_type == 'create_study_plan':
-            questions = {
-                'subject': "What subject is the exam on?",
-                'exam_date': "When is the exam?",
-                'hours_per_day': "How many hours per day can you study?"
-            }
-            return questions.get(self.next_field, "")
-        
-        return ""
+        questions = self.QUESTIONS.get(self.context_type, {})
+        return questions.get(self.next_field, "")
     
     def add_response(self, response):
         """Add user's response and update state"""
@@ -7,9 +7,34 @@ education.py
 
 import json
 import os
+import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
+from intent_matcher import PhraseMatcher
+
+# check_command triggers (substrings of the lowercased text), matched in one pass
+QUESTION_STARTERS = ["what", "which", "when", "where", "how", "do", "does", "is", "are", "can", "could", "show", "tell", "list"]
+
+EDUCATION_PHRASES = {
+    "question": ["do i have", "what assignment", "what homework", "what task",
+                 "which assignment", "which homework"],
+    "view": ["assignment", "homework", "due", "deadline", "task"],
+    "today": ["today"],
+    "week": ["this week", "next week", "week"],
+    "tomorrow": ["tomorrow"],
+    "urgent": ["urgent"],
+    "add": ["add", "new", "create", "got", "i have"],
+    "assignment": ["assignment", "homework", "task", "project", "essay"],
+    "study": ["study", "prepare", "exam", "test", "quiz", "midterm", "final"],
+    "study_action": ["help", "plan", "create", "make", "need to"],
+    "studying": ["study", "studying"],
+    "now": ["now"],
+}
+
+_QUESTION_START = re.compile("(?:" + "|".join(QUESTION_STARTERS) + ") ")
+INTENTS = PhraseMatcher(EDUCATION_PHRASES)
+
 
 class EducationAssistant:
     def __init__(self, data_file="jarvis_education_data.json"):
@@ -383,68 +408,45 @@ class EducationAssistant:
     
     # ==================== COMMAND DETECTION ====================
     
-    def check_command(self, text: str) -> Tuple[Optional[str], Optional[Dict]]:
-        """Check if text contains an education command"""
+    def check_command(self, text: str, matches=None) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Check if text contains an education command
+        matches: INTENTS-style MatchSet of the text, if the caller already has one
+        """
         text_lower = text.lower().strip()
+        if matches is None:
+            matches = INTENTS.match(text_lower)
         
         # SMART QUESTION DETECTION (doesn't rely on punctuation!)
-        # Check if sentence STARTS with question words
-        question_starters = ["what", "which", "when", "where", "how", "do", "does", "is", "are", "can", "could", "show", "tell", "list"]
-        starts_with_question = any(text_lower.startswith(word + " ") for word in question_starters)
-        
-        # Additional question patterns
-        has_question_pattern = any(pattern in text_lower for pattern in [
-            "do i have",
-            "what assignment",
-            "what homework",
-            "what task",
-            "which assignment",
-            "which homework"
-        ])
-        
-        is_question = starts_with_question or has_question_pattern
+        # Sentence STARTS with a question word, or has a question pattern
+        starts_with_question = _QUESTION_START.match(text_lower) is not None
+        is_question = starts_with_question or "question" in matches
         
         # PRIORITY 1: VIEW ASSIGNMENTS - If it's a question about assignments
-        view_keywords = ["assignment", "homework", "due", "deadline", "task"]
-        has_view_keyword = any(keyword in text_lower for keyword in view_keywords)
-        
-        if is_question and has_view_keyword:
+        if is_question and "view" in matches:
             # Check for time filters
-            if "today" in text_lower:
+            if "today" in matches:
                 return "view_assignments", {"filter": "today"}
-            elif "this week" in text_lower or "next week" in text_lower or "week" in text_lower:
+            elif "week" in matches:
                 return "view_assignments", {"filter": "this_week"}
-            elif "tomorrow" in text_lower:
+            elif "tomorrow" in matches:
                 return "view_assignments", {"filter": "urgent"}
-            elif "urgent" in text_lower:
+            elif "urgent" in matches:
                 return "view_assignments", {"filter": "urgent"}
             else:
                 return "view_assignments", {"filter": "all"}
         
         # PRIORITY 2: ADD ASSIGNMENT - Only if NOT a question
-        if not is_question:
-            add_keywords = ["add", "new", "create", "got", "i have"]
-            assignment_keywords = ["assignment", "homework", "task", "project", "essay"]
-            
-            has_add_keyword = any(keyword in text_lower for keyword in add_keywords)
-            has_assignment_keyword = any(keyword in text_lower for keyword in assignment_keywords)
-            
-            if has_add_keyword and has_assignment_keyword:
-                return "add_assignment_prompt", {"original_text": text}
+        if not is_question and "add" in matches and "assignment" in matches:
+            return "add_assignment_prompt", {"original_text": text}
         
         # CREATE STUDY PLAN - Enhanced detection
-        study_keywords = ["study", "prepare", "exam", "test", "quiz", "midterm", "final"]
-        action_keywords = ["help", "plan", "create", "make", "need to"]
-        
-        has_study_keyword = any(keyword in text_lower for keyword in study_keywords)
-        has_action_keyword = any(keyword in text_lower for keyword in action_keywords)
-        
-        if has_study_keyword and has_action_keyword:
+        if "study" in matches and "study_action" in matches:
             return "create_study_plan_prompt", {"original_text": text}
         
         # TODAY'S STUDY PLAN - Enhanced detection
-        if any(keyword in text_lower for keyword in ["study", "studying"]):
-            if "today" in text_lower or "now" in text_lower:
+        if "studying" in matches:
+            if "today" in matches or "now" in matches:
                 return "today_study_plan", {}
         
         return None, None
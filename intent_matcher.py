@@ -0,0 +1,180 @@
+"""
+JARVIS Intent Matcher
+Every trigger phrase found in one regex pass over the utterance, so routing
+cost stays flat as phrases are added
+
+Usage:
+    python intent_matcher.py                 # route + time the built-in corpus
+    python intent_matcher.py corpus.txt --runs 2000
+intent_matcher.py
+"""
+
+import argparse
+import re
+import time
+
+
+def _trie_regex(phrases):
+    """One pattern for all phrases, shaped like a trie (shared prefixes are tested once)"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = None  # a phrase ends here
+    return _node_regex(trie)
+
+
+def _node_regex(node):
+    branches = [re.escape(char) + _node_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy: the longest phrase at this position wins, shorter ones are added back below
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+
+class MatchSet:
+    """Result of PhraseMatcher.match: first position of every phrase and label found"""
+
+    __slots__ = ("phrases", "labels")
+
+    def __init__(self, phrases, labels):
+        self.phrases = phrases  # phrase -> index of its first occurrence
+        self.labels = labels    # label -> index of its first phrase occurrence
+
+    def __contains__(self, label):
+        return label in self.labels
+
+    def __repr__(self):
+        return f"MatchSet({sorted(self.labels)})"
+
+
+class PhraseMatcher:
+    """
+    Substring matcher for groups of trigger phrases.
+    Built once from {label: [phrases]}; match(text) gives the same answers as
+    `any(phrase in text for phrase in group)` for every group at once, plus
+    where each phrase first occurs (for slicing out queries).
+    A zero-width lookahead runs the trie pattern at every position, so
+    overlapping phrases are all found; phrases that are prefixes of the one
+    matched at a position are filled in from a table built up front
+    """
+
+    def __init__(self, groups):
+        self._labels = {}
+        for label, phrases in groups.items():
+            for phrase in phrases:
+                self._labels.setdefault(phrase, []).append(label)
+
+        phrases = sorted(self._labels)
+        self._prefixes = {
+            phrase: tuple((shorter, tuple(self._labels[shorter]))
+                          for shorter in phrases if phrase.startswith(shorter))
+            for phrase in phrases
+        }
+        self._pattern = re.compile("(?=(" + _trie_regex(phrases) + "))") if phrases else None
+
+    def match(self, text):
+        """MatchSet of everything in text (already lowercased by the caller)"""
+        phrases = {}
+        labels = {}
+        if self._pattern is None:
+            return MatchSet(phrases, labels)
+
+        for found in self._pattern.finditer(text):
+            start = found.start()
+            for phrase, phrase_labels in self._prefixes[found.group(1)]:
+                if phrase not in phrases:
+                    phrases[phrase] = start
+                    for label in phrase_labels:
+                        if label not in labels:
+                            labels[label] = start
+        return MatchSet(phrases, labels)
+
+
+# Utterances for the micro-benchmark (a mix of commands and plain questions)
+CORPUS = [
+    "run diagnostics",
+    "jarvis give me a system status report",
+    "turn on focus mode for 45 minutes",
+    "start focus for 1 hour",
+    "start study timer",
+    "stop focus mode",
+    "pause focus",
+    "resume timer please",
+    "extend focus mode by 10 minutes",
+    "add time",
+    "play music",
+    "play the oppenheimer song",
+    "stop the music",
+    "search for python tutorials",
+    "google the weather in london for me",
+    "look up the boiling point of water",
+    "search the web for black holes now",
+    "what assignments do I have due this week",
+    "do i have any homework today",
+    "which tasks are urgent",
+    "add my physics assignment due friday",
+    "I got a new essay for english",
+    "help me study for my chemistry exam",
+    "I need to prepare for the biology midterm",
+    "what should I study today",
+    "what is the capital of france",
+    "explain newton's second law",
+    "how does photosynthesis work",
+    "tell me a joke",
+    "who wrote pride and prejudice",
+    "what's the difference between mitosis and meiosis",
+    "can you summarize the french revolution",
+    "I'm studying right now",
+    "create a study plan for the final",
+    "thanks jarvis",
+]
+
+
+def main():
+    from control import SystemController
+
+    parser = argparse.ArgumentParser(description="Route a corpus of utterances and time check_command")
+    parser.add_argument("corpus", nargs="?", help="text file, one utterance per line (default: built-in)")
+    parser.add_argument("--runs", type=int, default=1000, help="passes over the corpus")
+    parser.add_argument("--quiet", action="store_true", help="don't print each routing result")
+    args = parser.parse_args()
+
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+
+    controller = SystemController()
+    if not args.quiet:
+        for text in corpus:
+            cmd_type, details = controller.check_command(text)
+            print(f"{text[:48]:<50}{cmd_type or '-':<26}{details if details is not None else ''}")
+
+    from control import INTENTS
+    lowered = [text.lower() for text in corpus]
+    calls = args.runs * len(corpus)
+
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        for text in lowered:
+            INTENTS.match(text)
+    match_us = (time.perf_counter() - start) / calls * 1e6
+
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        for text in corpus:
+            controller.check_command(text)
+    route_us = (time.perf_counter() - start) / calls * 1e6
+
+    print(f"\n{len(corpus)} utterances x {args.runs} runs")
+    print(f"PhraseMatcher.match      {match_us:8.2f} us/utterance")
+    print(f"check_command (routing)  {route_us:8.2f} us/utterance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+JARVIS LLM Gateway
+Every LLM call from the voice assistant and the web app goes through here:
+pooled keep-alive connections, per-call deadlines, optional hedged requests,
+a circuit breaker with a canned fallback reply, and a local stand-in backend
+llm_gateway.py
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+FALLBACK_REPLY = "I'm having trouble reaching my language model right now, sir. Please try again in a moment."
+
+_END_OF_STREAM = object()
+
+
+class _Usage:
+    """Token usage for backends that don't report their own"""
+
+    def __init__(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class GroqBackend:
+    """Groq chat completions over one shared keep-alive connection pool"""
+
+    def __init__(self, api_key, max_connections=10, max_keepalive=5, connect_timeout=5.0):
+        import httpx
+        from groq import Groq
+
+        self.client = Groq(
+            api_key=api_key,
+            max_retries=0,  # retries/hedging are the gateway's job
+            http_client=httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive
+                ),
+                timeout=httpx.Timeout(30.0, connect=connect_timeout)
+            )
+        )
+
+    def complete(self, messages, model, timeout, **params):
+        """Returns: (text, usage)"""
+        completion = self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            timeout=timeout,
+            **params
+        )
+        return completion.choices[0].message.content, completion.usage
+
+    def stream(self, messages, model, timeout, **params):
+        """Yields (text_delta, usage); usage is only set on the final chunk"""
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            timeout=timeout,
+            stream=True,
+            **params
+        )
+        for chunk in stream:
+            # Groq reports token usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            yield delta or "", usage
+
+
+class LocalBackend:
+    """
+    Offline stand-in for tests and benchmarks.
+    reply is a fixed string or fn(messages) -> str; latency simulates the
+    network round trip and fail_rate injects errors
+    """
+
+    def __init__(self, reply=None, latency=0.0, token_interval=0.0, fail_rate=0.0):
+        self.reply = reply
+        self.latency = latency
+        self.token_interval = token_interval
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, messages):
+        with self._lock:
+            self.calls += 1
+            fail = self.fail_rate and (self.calls * self.fail_rate) % 1 < self.fail_rate
+        if fail:
+            raise ConnectionError("local backend: injected failure")
+
+        if callable(self.reply):
+            return self.reply(messages)
+        if self.reply is not None:
+            return self.reply
+        return f"Certainly, sir. You said: {messages[-1]['content']}"
+
+    def _usage(self, messages, text):
+        prompt = sum(len(m["content"]) for m in messages) // 4 + 1
+        return _Usage(prompt, len(text) // 4 + 1)
+
+    def complete(self, messages, model, timeout, **params):
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise TimeoutError("local backend: deadline exceeded")
+        text = self._answer(messages)
+        return text, self._usage(messages, text)
+
+    def stream(self, messages, model, timeout, **params):
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise TimeoutError("local backend: deadline exceeded")
+        text = self._answer(messages)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.token_interval:
+                time.sleep(self.token_interval)
+            yield (word if i == 0 else " " + word), None
+        yield "", self._usage(messages, text)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend for a while.
+    Opens after failure_threshold consecutive failures; after reset_timeout
+    one trial call is let through (half-open) and its result decides
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class LLMGateway:
+    """
+    Chat completions with a deadline per call, optional hedging (a second
+    identical request if the first is slow; the first answer wins), a
+    circuit breaker that answers with a canned reply while the backend is down
+    and an optional ResponseCache for repeated questions
+    """
+
+    def __init__(self, backend, model, timeout=10.0, hedge_after=None,
+                 breaker=None, fallback_reply=FALLBACK_REPLY, max_workers=8, cache=None):
+        self.backend = backend
+        self.model = model
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.fallback_reply = fallback_reply
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self.stats = {"calls": 0, "failures": 0, "fallbacks": 0, "hedged": 0}
+
+    def _call(self, messages, params):
+        """
+        One logical call: a single request or a hedged pair, within the deadline.
+        Requests run on the executor, so a response that trickles in slowly is
+        abandoned at the deadline rather than only at the HTTP read timeout
+        """
+        deadline = time.monotonic() + self.timeout
+
+        def attempt():
+            return self.backend.complete(messages, self.model, max(0.1, deadline - time.monotonic()), **params)
+
+        futures = [self._executor.submit(attempt)]
+        if self.hedge_after is not None:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                self.stats["hedged"] += 1
+                futures.append(self._executor.submit(attempt))
+
+        last_error = TimeoutError("LLM deadline exceeded")
+        while futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+            futures = list(pending)
+
+        raise last_error
+
+    def _stream_within_deadline(self, messages, params):
+        """
+        backend.stream read on the executor; every chunk must arrive before the
+        call's deadline, otherwise TimeoutError (the backend stream is then closed)
+        """
+        deadline = time.monotonic() + self.timeout
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def produce():
+            stream = self.backend.stream(messages, self.model, self.timeout, **params)
+            try:
+                for item in stream:
+                    if stop.is_set():
+                        return
+                    chunks.put(item)
+                chunks.put(_END_OF_STREAM)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+
+        self._executor.submit(produce)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = chunks.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    raise TimeoutError("LLM deadline exceeded") from None
+                if item is _END_OF_STREAM:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def _cache_key(self, messages, params, cache):
+        if cache and self.cache is not None:
+            return self.cache.key(messages, self.model, params)
+        return None
+
+    def complete(self, messages, cache=True, **params):
+        """
+        Get a chat completion (cache=False bypasses the response cache)
+        Returns: (success, text, usage); on failure text is the fallback reply,
+        on a cache hit usage is None
+        """
+        self.stats["calls"] += 1
+        cache_key = self._cache_key(messages, params, cache)
+        if cache_key is not None:
+            text = self.cache.get(cache_key)
+            if text is not None:
+                return True, text, None
+
+        if not self.breaker.allow():
+            self.stats["fallbacks"] += 1
+            return False, self.fallback_reply, None
+
+        try:
+            text, usage = self._call(messages, params)
+        except Exception as e:
+            self.breaker.record_failure()
+            self.stats["failures"] += 1
+            self.stats["fallbacks"] += 1
+            print(f"LLM error ({self.breaker.state}): {e}")
+            return False, self.fallback_reply, None
+
+        self.breaker.record_success()
+        if cache_key is not None and text:
+            self.cache.put(cache_key, text)
+        return True, text, usage
+
+    def stream(self, messages, on_usage=None, on_error=None, cache=True, **params):
+        """
+        Yield the completion as text deltas (a cached answer arrives as one delta).
+        If the call fails before any text arrived, the fallback reply is yielded instead.
+        on_error(exception) is called whenever the call fails (circuit open, backend
+        error, deadline), including after partial text, so the caller can tell a
+        truncated or canned answer from a real one
+        """
+        self.stats["calls"] += 1
+        cache_key = self._cache_key(messages, params, cache)
+        if cache_key is not None:
+            text = self.cache.get(cache_key)
+            if text is not None:
+                yield text
+                return
+
+        if not self.breaker.allow():
+            self.stats["fallbacks"] += 1
+            if on_error:
+                on_error(RuntimeError(f"circuit {self.breaker.state}"))
+            yield self.fallback_reply
+            return
+
+        parts = []
+        try:
+            for delta, usage in self._stream_within_deadline(messages, params):
+                if usage is not None and on_usage:
+                    on_usage(usage)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            self.breaker.record_failure()
+            self.stats["failures"] += 1
+            print(f"LLM stream error ({self.breaker.state}): {e}")
+            if on_error:
+                on_error(e)
+            if not parts:
+                self.stats["fallbacks"] += 1
+                yield self.fallback_reply
+            return
+
+        self.breaker.record_success()
+        if cache_key is not None and parts:
+            self.cache.put(cache_key, "".join(parts))
+
+
+def create_gateway(api_key, model, backend=None, **options):
+    """
+    Build the gateway used by main.py and app.py.
+    JARVIS_LLM_BACKEND=local swaps in the offline stand-in (tests, benchmarks)
+    """
+    if backend is None:
+        if os.getenv("JARVIS_LLM_BACKEND", "groq").lower() == "local":
+            backend = LocalBackend()
+        else:
+            backend = GroqBackend(api_key)
+    return LLMGateway(backend, model, **options)
+
+
+if __name__ == "__main__":
+    # Quick self-check with the local backend
+    gateway = LLMGateway(LocalBackend(latency=0.3), "local", timeout=1.0, hedge_after=0.1,
+                         breaker=CircuitBreaker(failure_threshold=2, reset_timeout=1.0))
+    print(gateway.complete([{"role": "user", "content": "hello"}]))
+    print("".join(gateway.stream([{"role": "user", "content": "stream this"}])))
+
+    slow = LLMGateway(LocalBackend(latency=2.0), "local", timeout=0.2,
+                      breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(3):
+        print(slow.complete([{"role": "user", "content": "hello"}])[:2], slow.breaker.state)
+    print(gateway.stats, slow.stats)
@@ -7,74 +7,164 @@ Enhanced JARVIS with Conversation Mode
 """
 
 import numpy as np
-import sounddevice as sd
-from faster_whisper import WhisperModel
-import queue
 import sys
-from scipy.io import wavfile
-import tempfile
 import os
 import time
-import asyncio
-import edge_tts
 import pygame
-from groq import Groq
 import pvporcupine
-import torch
-
-# Import Silero VAD
-torch.set_num_threads(1)
-from silero_vad import load_silero_vad, read_audio, get_speech_timestamps
 
 # Import the system controller and conversation state
 from control import SystemController
 from conversation_state import ConversationState
+from chat_history import ChatHistory
+from llm_gateway import create_gateway
+from response_cache import ResponseCache
+from audio_buffers import CaptureBuffer
+from audio_input import SharedMicrophone
+from speech_to_text import get_transcriber, StreamingTranscription
+from text_to_speech import StreamingSpeech, PhraseCache, SpeechWorker, SentenceSplitter
+from startup import ComponentLoader
+from vad import load_vad, EnergyGate
+from tracing import Tracer
+from music import MusicEngine
+from autotune import load_profile
 
 # ==================== CONFIGURATION ====================
 PICOVOICE_ACCESS_KEY = "your-picovoice-access-key-here"
 GROQ_API_KEY = "your-api-key-here"
 GROQ_MODEL = "llama-3.1-8b-instant"
+LLM_STREAMING = True  # speak the AI answer sentence by sentence while it generates
+LLM_TIMEOUT = 8.0     # seconds per LLM call before the canned fallback reply is used
+LLM_HEDGE_AFTER = None  # seconds; send a second identical request if the first is this slow
+
+# Answers to repeated questions (shared with the web app)
+LLM_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "llm_cache.sqlite")
+LLM_CACHE_TTL = 7 * 24 * 3600  # seconds
+LLM_CACHE_ENTRIES = 256        # in memory; the SQLite file keeps more
+
+# Conversation history sent to the LLM
+HISTORY_TOKEN_BUDGET = 1500  # estimated prompt tokens per request
+HISTORY_KEEP_TURNS = 3       # most recent exchanges that are always sent
+HISTORY_SUMMARIZE = False    # fold dropped turns into a rolling summary (costs an LLM call)
 WHISPER_MODEL = "base"
 DEVICE = "cpu"
+WHISPER_BEAM_SIZE = 5
+# Written by `python autotune.py` on this machine; overrides the three settings above
+STT_PROFILE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "stt_profile.json")
 
 WAKE_WORD = "jarvis"
+WAKE_SENSITIVITY = 0.5
+
+# Barge-in: the wake word interrupts JARVIS while it is speaking
+BARGE_IN = True
+BARGE_IN_SENSITIVITY = 0.3  # stricter while the speaker is playing, so echo doesn't wake it
 
 TTS_VOICE = "en-GB-RyanNeural"
 TTS_RATE = "+5%"
-MUSIC_FILE = "cornfieldchase.mp3"
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jarvis", "tts_cache")
+TTS_CACHE_DISK_MB = 50
+TTS_CACHE_MEMORY_MB = 32
+TTS_CACHE_WARMUP = True  # pre-synthesize the fixed phrases at startup
+MUSIC_FILE = "cornfieldchase.mp3"  # default track
+MUSIC_TRACKS = ["cornfieldchase.mp3", "oppenheimer.mp3"]  # decoded once at startup
+MUSIC_VOLUME = 0.7
+MUSIC_DUCK_VOLUME = 0.15  # music level while JARVIS speaks
 
 # VAD Configuration
+VAD_BACKEND = "auto"  # "onnx" (no torch), "torch", or "auto" (ONNX when onnxruntime is installed)
 VAD_SAMPLE_RATE = 16000
 VAD_CHUNK_SIZE = 512
+ENERGY_GATE = True          # skip the VAD model on chunks that are clearly silent
+ENERGY_GATE_MARGIN_DB = 6.0  # "clearly silent" = within this of the learned noise floor
 SILENCE_DURATION = 0.5
 MIN_SPEECH_DURATION = 0.5
 MAX_RECORDING_DURATION = 30
+SPEECH_PREROLL = 0.3  # seconds of audio kept before the first speech chunk
+SPEECH_TAIL = 0.2     # seconds kept after the last speech chunk (the endpoint silence isn't decoded)
+# The live VAD already trimmed the audio, so Whisper's own VAD pass is redundant
+WHISPER_VAD_FILTER = False
+
+# Streaming STT: decode while the user is still speaking
+STREAMING_STT = True
+STREAMING_STEP = 1.0  # seconds of new audio between partial decodes
+
+# Audio consumers block on the microphone; this bounds how long a wait can last
+AUDIO_QUEUE_TIMEOUT = 0.1
+
+# Shared microphone: frames kept if the consumer falls behind (~2s at 512 samples/frame)
+AUDIO_RING_FRAMES = 64
+AUDIO_OVERFLOW = "overwrite"  # when the ring is full: "overwrite" the oldest frames or "drop" new ones
+# Frames just before the wake word fired, prepended to the command (~100ms)
+COMMAND_PREROLL_FRAMES = 3
+
+# Per-turn stage timings (summarize with: python tracing.py)
+TRACING = True
+TRACE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "traces.jsonl")
+TRACE_MAX_BYTES = 1024 * 1024
+TRACE_BACKUPS = 3
+
+# Startup: heavy models load in the background while the wake word engine starts
+STARTUP_WORKERS = 4
+STARTUP_REPORT_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "startup.jsonl")
 # =======================================================
 
 
 class TarsVoiceAssistant:
     def __init__(self):
         print("Initializing JARVIS with Conversation Mode...")
+        self.components = ComponentLoader(max_workers=STARTUP_WORKERS)
+        self.tracer = Tracer(TRACE_FILE, max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS, enabled=TRACING)
         
         # Initialize Conversation State
         self.conversation = ConversationState()
         
-        # Initialize System Controller
-        print("Loading System Controller...")
-        self.system_controller = SystemController()
-        
-        # Initialize Silero VAD
-        print("Loading Silero VAD model...")
-        self.vad_model = load_silero_vad()
-        self.vad_model.eval()
+        # Whisper settings: this machine's autotune profile, else the defaults above
+        profile = load_profile(STT_PROFILE_FILE)
+        self.stt_settings = profile or {"model": WHISPER_MODEL, "device": DEVICE, "beam_size": WHISPER_BEAM_SIZE}
+        self.whisper_model_options = {key: self.stt_settings[key]
+                                      for key in ("compute_type", "cpu_threads") if key in self.stt_settings}
+        self.whisper_options = {"beam_size": self.stt_settings["beam_size"], "vad_filter": WHISPER_VAD_FILTER}
+        if profile:
+            print(f"✓ STT profile: Whisper {profile['model']} {profile['compute_type']}, "
+                  f"{profile['cpu_threads']} threads, beam {profile['beam_size']}")
+        
+        # Heavy, independent models load concurrently in the background;
+        # the first command waits for them only if they aren't ready yet
+        print("Loading Silero VAD, Whisper and the AI client in the background...")
+        self.components.submit("vad", load_vad, VAD_BACKEND, sample_rate=VAD_SAMPLE_RATE)
+        self.components.submit("whisper", get_transcriber, self.stt_settings["model"],
+                               device=self.stt_settings["device"], **self.whisper_model_options)
+        self.components.submit(
+            "llm", create_gateway, GROQ_API_KEY, GROQ_MODEL,
+            timeout=LLM_TIMEOUT, hedge_after=LLM_HEDGE_AFTER,
+            cache=ResponseCache(LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_ENTRIES)
+        )
+        
+        # Only needed once a command is recognized
+        self.components.defer("system_controller", SystemController)
+        if STREAMING_STT:
+            self.components.defer("streaming_stt", self._create_streaming_stt)
         
         # Initialize Porcupine
         print(f"Loading Porcupine wake word engine (keyword: '{WAKE_WORD}')...")
         try:
-            self.porcupine = pvporcupine.create(
+            self.porcupine = self.components.run(
+                "porcupine",
+                pvporcupine.create,
                 access_key=PICOVOICE_ACCESS_KEY,
-                keywords=[WAKE_WORD]
+                keywords=[WAKE_WORD],
+                sensitivities=[WAKE_SENSITIVITY]
             )
+            # Second detector used while JARVIS is speaking; both see every frame
+            self.porcupine_playback = None
+            if BARGE_IN:
+                self.porcupine_playback = self.components.run(
+                    "porcupine_playback",
+                    pvporcupine.create,
+                    access_key=PICOVOICE_ACCESS_KEY,
+                    keywords=[WAKE_WORD],
+                    sensitivities=[BARGE_IN_SENSITIVITY]
+                )
             self.porcupine_sample_rate = self.porcupine.sample_rate
             self.porcupine_frame_length = self.porcupine.frame_length
             print(f"✓ Porcupine initialized (sample rate: {self.porcupine_sample_rate}Hz)")
@@ -82,21 +172,32 @@ class TarsVoiceAssistant:
             print(f"ERROR: Failed to initialize Porcupine: {e}")
             sys.exit(1)
         
-        # Speech-to-Text
-        print("Loading Whisper model...")
-        self.whisper_model = WhisperModel(WHISPER_MODEL, device=DEVICE)
+        # One stream feeds Porcupine and the VAD, so their frame formats must agree
+        if (self.porcupine_sample_rate, self.porcupine_frame_length) != (VAD_SAMPLE_RATE, VAD_CHUNK_SIZE):
+            print(f"ERROR: Porcupine frames ({self.porcupine_frame_length} @ {self.porcupine_sample_rate}Hz) "
+                  f"don't match VAD chunks ({VAD_CHUNK_SIZE} @ {VAD_SAMPLE_RATE}Hz)")
+            sys.exit(1)
+        
+        # Speech-to-Text (the model itself is loading in the background)
         self.whisper_sample_rate = VAD_SAMPLE_RATE
         
-        # Audio queues
-        self.wake_word_queue = queue.Queue()
-        self.command_queue = queue.Queue()
+        # Microphone (opened once in start() and shared by every stage)
+        self.microphone = SharedMicrophone(
+            sample_rate=self.porcupine_sample_rate,
+            frame_length=self.porcupine_frame_length,
+            buffer_frames=AUDIO_RING_FRAMES,
+            preroll_frames=COMMAND_PREROLL_FRAMES,
+            overflow=AUDIO_OVERFLOW
+        )
         self.is_running = False
         self.is_listening_for_command = False
         
-        # AI Chat
-        print("Connecting to GROQ AI...")
-        self.groq_client = Groq(api_key=GROQ_API_KEY)
-        self.conversation_history = []
+        # Energy pre-gate in front of the VAD (its noise floor persists across commands)
+        self.energy_gate = EnergyGate(margin_db=ENERGY_GATE_MARGIN_DB) if ENERGY_GATE else None
+        
+        # Command capture buffer, allocated once for the longest recording
+        max_chunks = int(np.ceil(MAX_RECORDING_DURATION * VAD_SAMPLE_RATE / VAD_CHUNK_SIZE))
+        self.capture_buffer = CaptureBuffer(max_chunks * VAD_CHUNK_SIZE)
         
         # JARVIS personality
         jarvis_prompt = """You are JARVIS, the AI assistant from Iron Man. Personality:
@@ -111,140 +212,225 @@ class TarsVoiceAssistant:
 
 Keep responses SHORT for natural conversation."""
 
-        self.conversation_history.append({
-            "role": "system",
-            "content": jarvis_prompt
-        })
+        self.conversation_history = ChatHistory(
+            jarvis_prompt,
+            max_prompt_tokens=HISTORY_TOKEN_BUDGET,
+            keep_recent_turns=HISTORY_KEEP_TURNS,
+            summarizer=self.summarize_history if HISTORY_SUMMARIZE else None
+        )
         
         # TTS
         print("Initializing TTS...")
         self.tts_voice = TTS_VOICE
         self.tts_rate = TTS_RATE
-        self.tts_temp_file = os.path.join(tempfile.gettempdir(), "jarvis_speech.mp3")
-        pygame.mixer.init()
-        
-        # Music
+        self.components.run("mixer", pygame.mixer.init)
+        self.tts_cache = PhraseCache(
+            TTS_CACHE_DIR,
+            max_disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024,
+            max_memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024
+        )
+        self.tts = StreamingSpeech(
+            self.tts_voice,
+            self.tts_rate,
+            cache=self.tts_cache,
+            on_audio_start=lambda: self.tracer.mark("first_audio_out")
+        )
+        
+        # Speech runs on one long-lived thread/event loop for the whole session
+        self.speech_worker = SpeechWorker(
+            self.speak_async,
+            stop=self.tts.stop,
+            prefetch=self.tts.prefetch,
+            discard=self.tts.discard_prefetched,
+            resume=self.tts.resume
+        )
+        
+        if TTS_CACHE_WARMUP:
+            # Runs alongside playback on the speech loop; the greeting doesn't wait for it
+            self.components.submit("tts_warmup", self.warm_tts_cache)
+        
+        # Music (tracks are decoded in the background)
         self.music_file = MUSIC_FILE
-        self.music_playing = False
-        
-        if os.path.exists(self.music_file):
-            print(f"✓ Music file found: {self.music_file}")
-        else:
-            print(f"⚠️  Warning: Music file not found: {self.music_file}")
-        
-        print("✓ JARVIS fully initialized with Conversation Mode!")
+        self.music = MusicEngine(
+            [MUSIC_FILE] + [track for track in MUSIC_TRACKS if track != MUSIC_FILE],
+            volume=MUSIC_VOLUME,
+            duck_volume=MUSIC_DUCK_VOLUME
+        )
+        self.components.submit("music", self.music.preload)
+        
+        self.components.mark("initialized")
+        print("✓ JARVIS initialized with Conversation Mode (models finish loading in the background)")
         print(f"✓ Wake word: '{WAKE_WORD.upper()}'")
         print(f"✓ Voice: {TTS_VOICE}")
         print(f"✓ AI Model: {GROQ_MODEL}")
     
-    def wake_word_callback(self, indata, frames, time, status):
-        """Callback for wake word detection"""
-        if status:
-            print(status, file=sys.stderr)
-        self.wake_word_queue.put(indata.copy())
+    @property
+    def vad_model(self):
+        return self.components.get("vad")
+    
+    @property
+    def transcriber(self):
+        return self.components.get("whisper")
+    
+    @property
+    def whisper_model(self):
+        return self.transcriber.model
     
-    def command_callback(self, indata, frames, time, status):
-        """Callback for command audio stream"""
-        if status:
-            print(status, file=sys.stderr)
-        self.command_queue.put(indata.copy())
+    @property
+    def streaming_stt(self):
+        return self.components.get("streaming_stt") if STREAMING_STT else None
+    
+    @property
+    def llm(self):
+        return self.components.get("llm")
+    
+    @property
+    def system_controller(self):
+        return self.components.get("system_controller")
+    
+    def _create_streaming_stt(self):
+        return StreamingTranscription(
+            self.transcriber,
+            sample_rate=VAD_SAMPLE_RATE,
+            step=STREAMING_STEP,
+            **self.whisper_options
+        )
+    
+    def warm_tts_cache(self):
+        """Pre-synthesize the fixed phrases into the TTS cache"""
+        print("Warming up TTS phrase cache...")
+        self.speech_worker.run(self.tts.warm(self.known_phrases()))
     
     def is_speech(self, audio_chunk):
         """Use Silero VAD to detect speech"""
-        audio_tensor = torch.from_numpy(audio_chunk).float()
-        with torch.no_grad():
-            speech_prob = self.vad_model(audio_tensor, VAD_SAMPLE_RATE).item()
-        return speech_prob
+        return self.vad_model(audio_chunk)
+    
+    def on_partial_transcript(self, text):
+        """Show the partial hypothesis while the user is still speaking"""
+        print(f"\n💭 {text}", flush=True)
     
     def listen_for_command_vad(self):
         """Listen with real-time VAD"""
         print("🎤 Listening... (speak naturally, I'll detect when you're done)")
         self.is_listening_for_command = True
         
-        audio_buffer = np.array([], dtype=np.float32)
+        capture = self.capture_buffer
+        capture.reset()
+        self.vad_model.reset()
+        if self.energy_gate:
+            self.energy_gate.reset_counts()
+        preroll_samples = int(SPEECH_PREROLL * VAD_SAMPLE_RATE)
+        tail_samples = int(SPEECH_TAIL * VAD_SAMPLE_RATE)
+        
+        if self.streaming_stt:
+            self.streaming_stt.start(on_partial=self.on_partial_transcript)
         
-        # Clear queue
-        while not self.command_queue.empty():
-            self.command_queue.get()
+        # Pre-roll: audio just before the wake word fired (the stream is never reopened,
+        # so the next frame read is the one right after the wake word)
+        for frame in self.microphone.recent_frames():
+            capture.append(frame)
         
+        dropped_before = self.microphone.dropped_frames
         start_time = time.time()
         last_speech_time = start_time
         speech_started = False
         consecutive_silence_chunks = 0
         silence_threshold_chunks = int((SILENCE_DURATION * VAD_SAMPLE_RATE) / VAD_CHUNK_SIZE)
         
-        with sd.InputStream(
-            samplerate=VAD_SAMPLE_RATE,
-            channels=1,
-            dtype=np.float32,
-            callback=self.command_callback,
-            blocksize=VAD_CHUNK_SIZE
-        ):
-            while True:
-                current_time = time.time()
-                
-                if current_time - start_time > MAX_RECORDING_DURATION:
-                    print("\n⏱️  Maximum duration reached")
-                    break
-                
-                if not self.command_queue.empty():
-                    chunk = self.command_queue.get()
-                    chunk_flat = chunk.flatten()
-                    audio_buffer = np.append(audio_buffer, chunk_flat)
-                    
-                    speech_prob = self.is_speech(chunk_flat)
-                    
-                    if speech_prob > 0.5:
-                        consecutive_silence_chunks = 0
-                        last_speech_time = current_time
-                        
-                        if not speech_started:
-                            speech_started = True
-                            print("🗣️  Speaking...", end="", flush=True)
-                        else:
-                            print("█", end="", flush=True)
-                    else:
-                        if speech_started:
-                            consecutive_silence_chunks += 1
-                            print("░", end="", flush=True)
-                    
-                    if speech_started and consecutive_silence_chunks >= silence_threshold_chunks:
-                        print(f"\n✅ Finished speaking (detected {SILENCE_DURATION}s silence)")
-                        break
+        while True:
+            current_time = time.time()
+            
+            if current_time - start_time > MAX_RECORDING_DURATION:
+                print("\n⏱️  Maximum duration reached")
+                break
+            
+            # Sleep until the microphone delivers the next frame
+            chunk = self.microphone.read(timeout=AUDIO_QUEUE_TIMEOUT)
+            if chunk is None:
+                continue
+            
+            chunk_flat = capture.append(chunk)
+            
+            if chunk_flat is None or len(chunk_flat) < VAD_CHUNK_SIZE:
+                print("\n⏱️  Maximum duration reached")
+                break
+            
+            if self.energy_gate and self.energy_gate.is_silent(chunk_flat):
+                speech_prob = 0.0
+            else:
+                speech_prob = self.is_speech(chunk_flat)
+                if self.energy_gate:
+                    self.energy_gate.observe(speech_prob > 0.5)
+            
+            if speech_prob > 0.5:
+                consecutive_silence_chunks = 0
+                last_speech_time = current_time
+                capture.mark_speech(len(chunk_flat))
+                self.tracer.mark("end_of_speech", overwrite=True)
                 
-                time.sleep(0.001)
+                if not speech_started:
+                    speech_started = True
+                    print("🗣️  Speaking...", end="", flush=True)
+                else:
+                    print("█", end="", flush=True)
+            else:
+                if speech_started:
+                    consecutive_silence_chunks += 1
+                    print("░", end="", flush=True)
+            
+            if speech_started and consecutive_silence_chunks >= silence_threshold_chunks:
+                print(f"\n✅ Finished speaking (detected {SILENCE_DURATION}s silence)")
+                break
+            
+            # Decode the next window in the background while recording continues
+            if speech_started and self.streaming_stt:
+                self.streaming_stt.update(capture.speech_view(preroll_samples))
         
         self.is_listening_for_command = False
+        # Nothing reads the microphone until the command is handled: stop buffering
+        # instead of queueing stale frames for the wake word stage
+        self.microphone.pause()
+        self.tracer.mark("endpoint")
+        self.tracer.annotate(mic_dropped=self.microphone.dropped_frames - dropped_before)
         
-        duration = len(audio_buffer) / VAD_SAMPLE_RATE
+        if self.energy_gate:
+            gate = self.energy_gate
+            print(f"🔇 Energy gate skipped {gate.skipped}/{gate.skipped + gate.checked} chunks")
+        
+        duration = capture.duration(VAD_SAMPLE_RATE)
         
         if duration < MIN_SPEECH_DURATION:
             print(f"⚠️  Recording too short ({duration:.1f}s)")
+            if self.streaming_stt:
+                self.streaming_stt.cancel()
+            return None
+        
+        if capture.speech_start is None:
+            print("⚠️  No speech detected")
+            if self.streaming_stt:
+                self.streaming_stt.cancel()
             return None
         
-        print(f"📊 Recorded {duration:.1f}s of audio, transcribing...")
+        # Only the spoken region (from the live VAD's segments) goes to STT,
+        # as a float32 view (no int16 copy)
+        spoken = capture.speech_view(preroll_samples, tail_samples)
+        spoken_duration = len(spoken) / VAD_SAMPLE_RATE
+        self.tracer.annotate(stt_audio=round(spoken_duration, 2), speech_segments=len(capture.speech_segments()))
+        print(f"📊 Recorded {duration:.1f}s of audio ({capture.chunks} chunks), "
+              f"transcribing {spoken_duration:.1f}s...")
+        
+        if self.streaming_stt:
+            # Only the uncommitted tail is left to decode
+            text = self.streaming_stt.finalize(spoken)
+        else:
+            text = self.transcribe_audio(spoken, VAD_SAMPLE_RATE)
         
-        audio_int16 = (audio_buffer * 32767).astype(np.int16)
-        return self.transcribe_audio(audio_int16, VAD_SAMPLE_RATE)
+        self.tracer.mark("stt_done")
+        return text
     
     def transcribe_audio(self, audio_data, sample_rate):
-        """Transcribe audio to text"""
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            tmp_filename = tmp_file.name
-            wavfile.write(tmp_filename, sample_rate, audio_data)
-        
-        try:
-            segments, info = self.whisper_model.transcribe(
-                tmp_filename,
-                beam_size=5,
-                language="en",
-                vad_filter=True
-            )
-            
-            text = " ".join([segment.text.strip() for segment in segments])
-            return text
-        finally:
-            os.unlink(tmp_filename)
+        """Transcribe audio to text (float32 in [-1, 1] or int16 samples)"""
+        return self.transcriber.transcribe_array(audio_data, sample_rate, **self.whisper_options)
     
     def check_music_command(self, text):
         """Check if user wants to control music"""
@@ -258,16 +444,14 @@ Keep responses SHORT for natural conversation."""
         
         return None
     
-    def play_music(self):
-        """Play music"""
-        if not os.path.exists(self.music_file):
-            return False
-        
+    @property
+    def music_playing(self):
+        return self.music.is_playing
+    
+    def play_music(self, track=None):
+        """Play music (switches instantly if another track is playing)"""
         try:
-            pygame.mixer.music.load(self.music_file)
-            pygame.mixer.music.play(-1)
-            self.music_playing = True
-            return True
+            return self.music.play(track or self.music_file)
         except Exception as e:
             print(f"Error playing music: {e}")
             return False
@@ -275,8 +459,7 @@ Keep responses SHORT for natural conversation."""
     def stop_music(self):
         """Stop music"""
         try:
-            pygame.mixer.music.stop()
-            self.music_playing = False
+            self.music.stop()
             return True
         except Exception as e:
             print(f"Error stopping music: {e}")
@@ -289,55 +472,134 @@ Keep responses SHORT for natural conversation."""
             "content": user_message
         })
         
-        try:
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=self.conversation_history,
-                model=GROQ_MODEL,
-                temperature=0.7,
-                max_tokens=200,
-            )
-            
-            assistant_message = chat_completion.choices[0].message.content
-            
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message
-            })
-            
+        success, assistant_message, usage = self.llm.complete(
+            self.conversation_history.messages(),
+            temperature=0.7,
+            max_tokens=200,
+        )
+        self.tracer.mark("first_llm_token")
+        
+        if not success:
+            # Canned fallback reply; don't teach it to the model as an answer
             return assistant_message
-            
-        except Exception as e:
-            return f"Error communicating with AI: {e}"
+        
+        self.conversation_history.record_usage(usage)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+        
+        return assistant_message
+    
+    def summarize_history(self, summary, dropped):
+        """Fold dropped turns into the rolling conversation summary"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+        success, text, usage = self.llm.complete(
+            [{
+                "role": "user",
+                "content": "Update this summary of a conversation with the new lines. "
+                           "Keep it under 80 words and keep facts the user mentioned.\n\n"
+                           f"Summary so far: {summary or '(none)'}\n\nNew lines:\n{transcript}"
+            }],
+            cache=False,
+            temperature=0.2,
+            max_tokens=150,
+        )
+        if not success:
+            raise RuntimeError("LLM unavailable")
+        return text.strip()
+    
+    def get_ai_response_streaming(self, user_message, on_sentence):
+        """
+        Get AI response as a token stream; each complete sentence is handed to
+        on_sentence while the rest is still generating. Returns the full text
+        """
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        splitter = SentenceSplitter()
+        parts = []
+        usage = []
+        errors = []
+        
+        for delta in self.llm.stream(
+            self.conversation_history.messages(),
+            on_usage=usage.append,
+            on_error=errors.append,
+            temperature=0.7,
+            max_tokens=200,
+        ):
+            self.tracer.mark("first_llm_token")
+            parts.append(delta)
+            for sentence in splitter.feed(delta):
+                on_sentence(sentence)
+        
+        rest = splitter.flush()
+        if rest:
+            on_sentence(rest)
+        
+        assistant_message = "".join(parts)
+        if errors:
+            # Canned fallback or a truncated answer; don't teach it to the model
+            return assistant_message
+        
+        self.conversation_history.record_usage(usage[-1] if usage else None)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+        
+        return assistant_message
+    
+    def known_phrases(self):
+        """Fixed utterances worth keeping in the TTS cache"""
+        phrases = [
+            "JARVIS online with conversation mode, sir.",
+            "JARVIS shutting down. Goodbye, sir.",
+            "I didn't catch that, sir.",
+            "Playing music now.",
+            "Music stopped.",
+            "Sorry, couldn't find the music file.",
+            self.llm.fallback_reply,
+        ]
+        
+        prefixes = {
+            'add_assignment': "I'll help you add that assignment. ",
+            'create_study_plan': "I'll create a study plan for you. ",
+        }
+        
+        for context_type, questions in ConversationState.QUESTIONS.items():
+            for question in questions.values():
+                phrases.append(question)
+                phrases.append("Sorry, I didn't catch that. " + question)
+                phrases.append(prefixes[context_type] + question)
+        
+        return phrases
     
-    async def speak_async(self, text):
-        """Generate and play speech"""
+    async def speak_async(self, text, cache=True):
+        """Generate and play speech (runs on the speech worker's loop)"""
+        # Music keeps playing, just quieter, while JARVIS talks
+        self.music.duck()
         try:
-            music_was_playing = self.music_playing
-            if music_was_playing:
-                pygame.mixer.music.pause()
+            # Playback starts with the first synthesized chunk
+            await self.tts.speak(text, cache=cache)
             
-            await asyncio.sleep(0.1)
-            
-            communicate = edge_tts.Communicate(text, self.tts_voice, rate=self.tts_rate)
-            await communicate.save(self.tts_temp_file)
-            
-            sound = pygame.mixer.Sound(self.tts_temp_file)
-            channel = sound.play()
-            
-            while channel.get_busy():
-                await asyncio.sleep(0.1)
-            
-            if music_was_playing:
-                pygame.mixer.music.unpause()
-                
         except Exception as e:
             print(f"TTS Error: {e}")
-            if music_was_playing:
-                pygame.mixer.music.unpause()
+        finally:
+            self.music.unduck()
+    
+    def speak(self, text, cache=True):
+        """Speak text and wait for playback (cache=False for one-off text such as AI answers)"""
+        return self.speech_worker.say_and_wait(text, cache=cache)
     
-    def speak(self, text):
-        """Speak text"""
-        asyncio.run(self.speak_async(text))
+    def say(self, text, cache=True):
+        """Queue text to speak and return immediately (the current turn's trace waits for it)"""
+        future = self.speech_worker.say(text, cache=cache)
+        self.tracer.track(future)
+        return future
     
     def process_conversation_response(self, response):
         """Handle response when in conversation mode"""
@@ -361,10 +623,10 @@ Keep responses SHORT for natural conversation."""
                 
                 if success:
                     print(f"✅ {message}")
-                    self.speak(message)
+                    self.say(message)
                 else:
                     print(f"❌ {message}")
-                    self.speak(f"Sorry, {message}")
+                    self.say(f"Sorry, {message}")
             
             elif self.conversation.context_type == 'create_study_plan':
                 data = self.conversation.get_data()
@@ -391,10 +653,10 @@ Keep responses SHORT for natural conversation."""
                 if success and plan:
                     display = self.system_controller.education.format_study_plan_display(plan)
                     print(display)
-                    self.speak(message)
+                    self.say(message)
                 else:
                     print(f"❌ {message}")
-                    self.speak(f"Sorry, {message}")
+                    self.say(f"Sorry, {message}")
             
             # Reset conversation
             self.conversation.reset()
@@ -404,11 +666,20 @@ Keep responses SHORT for natural conversation."""
             # Ask next question
             next_question = self.conversation.get_question()
             print(f"❓ JARVIS asks: {next_question}")
-            self.speak(next_question)
+            self.say(next_question)
             print(f"💤 Say '{WAKE_WORD.upper()}' then answer...")
     
     def process_command(self):
-        """Process voice command"""
+        """Process voice command (traced as one turn)"""
+        try:
+            with self.tracer.turn():
+                self._handle_command()
+        finally:
+            # The microphone was paused at the endpoint; wake word detection
+            # continues on fresh audio (nothing queued to drain)
+            self.microphone.resume()
+    
+    def _handle_command(self):
         # Check if we're in conversation mode
         if self.conversation.is_waiting_for_response():
             print("📝 Continuing conversation...")
@@ -419,11 +690,13 @@ Keep responses SHORT for natural conversation."""
                 print("⚠️  Didn't catch that")
                 # Ask the question again
                 question = self.conversation.get_question()
-                self.speak("Sorry, I didn't catch that. " + question)
+                self.say("Sorry, I didn't catch that. " + question)
                 print(f"💤 Say '{WAKE_WORD.upper()}' then answer...")
                 return
             
             # Process the response
+            self.tracer.mark("intent_resolved")
+            self.tracer.annotate(intent="conversation_response")
             self.process_conversation_response(response)
             return
         
@@ -432,7 +705,7 @@ Keep responses SHORT for natural conversation."""
         
         if not command or len(command.strip()) < 3:
             print("⚠️  No clear command detected")
-            self.speak("I didn't catch that, sir.")
+            self.say("I didn't catch that, sir.")
             print(f"💤 Ready for next '{WAKE_WORD.upper()}'...")
             return
         
@@ -442,6 +715,8 @@ Keep responses SHORT for natural conversation."""
         cmd_type, details = self.system_controller.check_command(command)
         
         if cmd_type:
+            self.tracer.mark("intent_resolved")
+            self.tracer.annotate(intent=cmd_type)
             print(f"🖥️  Command detected: {cmd_type}")
             
             # Check if this command needs conversation
@@ -449,7 +724,7 @@ Keep responses SHORT for natural conversation."""
                 # Start conversation
                 self.conversation.start_conversation('add_assignment')
                 question = self.conversation.get_question()
-                self.speak("I'll help you add that assignment. " + question)
+                self.say("I'll help you add that assignment. " + question)
                 print(f"💤 Say '{WAKE_WORD.upper()}' then answer...")
                 return
             
@@ -457,10 +732,28 @@ Keep responses SHORT for natural conversation."""
                 # Start conversation
                 self.conversation.start_conversation('create_study_plan')
                 question = self.conversation.get_question()
-                self.speak("I'll create a study plan for you. " + question)
+                self.say("I'll create a study plan for you. " + question)
                 print(f"💤 Say '{WAKE_WORD.upper()}' then answer...")
                 return
             
+            # Music is played here, not by the (web) controller
+            elif cmd_type == "music_play":
+                track = (details or {}).get("file")
+                print(f"🎵 Playing {track or 'music'}...")
+                if self.play_music(track):
+                    self.say("Playing music now.")
+                else:
+                    self.say("Sorry, couldn't find the music file.")
+                print(f"💤 Ready for next '{WAKE_WORD.upper()}'...")
+                return
+            
+            elif cmd_type == "music_stop":
+                print("⏹️  Stopping music...")
+                self.stop_music()
+                self.say("Music stopped.")
+                print(f"💤 Ready for next '{WAKE_WORD.upper()}'...")
+                return
+            
             # Execute other commands normally
             result = self.system_controller.execute_command(cmd_type, details)
             
@@ -476,36 +769,82 @@ Keep responses SHORT for natural conversation."""
                 if extra_data and 'display' in extra_data:
                     print(extra_data['display'])
                 
-                self.speak(message)
+                self.say(message)
             else:
                 print(f"❌ {message}")
-                self.speak(f"Sorry, {message}")
+                self.say(f"Sorry, {message}")
             
             print(f"💤 Ready for next '{WAKE_WORD.upper()}'...")
             return
         
         # Check music commands
         music_cmd = self.check_music_command(command)
+        self.tracer.mark("intent_resolved")
+        self.tracer.annotate(intent=f"music_{music_cmd}" if music_cmd else "ai_chat")
         
         if music_cmd == "play":
             print("🎵 Playing music...")
             if self.play_music():
-                self.speak("Playing music now.")
+                self.say("Playing music now.")
             else:
-                self.speak("Sorry, couldn't find the music file.")
+                self.say("Sorry, couldn't find the music file.")
         elif music_cmd == "stop":
             print("⏹️  Stopping music...")
             self.stop_music()
-            self.speak("Music stopped.")
+            self.say("Music stopped.")
         else:
             # Regular AI response
             print("🤔 JARVIS thinking...")
-            response = self.get_ai_response(command)
-            print(f"🤖 JARVIS: {response}\n")
-            self.speak(response)
+            if LLM_STREAMING:
+                # Each sentence is synthesized and played while later ones generate;
+                # playback carries on after this returns, so the wake word can interrupt it
+                response = self.get_ai_response_streaming(
+                    command,
+                    lambda sentence: self.say(sentence, cache=False)
+                )
+                print(f"🤖 JARVIS: {response}\n")
+            else:
+                response = self.get_ai_response(command)
+                print(f"🤖 JARVIS: {response}\n")
+                self.say(response, cache=False)
         
         print(f"💤 Ready for next '{WAKE_WORD.upper()}'...")
     
+    def wait_for_wake_word(self, timeout=None):
+        """Feed microphone frames to Porcupine until the wake word fires; False on timeout/stop"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while self.is_running:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            
+            # Block until the microphone delivers a frame (no busy-polling)
+            frame = self.microphone.read(timeout=AUDIO_QUEUE_TIMEOUT)
+            if frame is None:
+                continue
+            
+            # Both detectors see every frame so their internal state stays current
+            detected = self.porcupine.process(frame) >= 0
+            detected_in_playback = False
+            if self.porcupine_playback is not None:
+                detected_in_playback = self.porcupine_playback.process(frame) >= 0
+            
+            if not self.speech_worker.is_busy():
+                if detected:
+                    return True
+            elif detected_in_playback and not self.speaking_wake_word():
+                # Barge-in: cut playback now, then capture the new command
+                print("\n✋ Interrupted")
+                self.speech_worker.cancel()
+                return True
+        
+        return False
+    
+    def speaking_wake_word(self):
+        """True if JARVIS is saying its own wake word (a detection now is likely echo)"""
+        text = self.speech_worker.current_text
+        return text is not None and WAKE_WORD in text.lower()
+    
     def start(self):
         """Start JARVIS"""
         print(f"\n{'='*60}")
@@ -521,41 +860,21 @@ Keep responses SHORT for natural conversation."""
         self.speak("JARVIS online with conversation mode, sir.")
         
         self.is_running = True
-        audio_buffer = np.array([], dtype=np.int16)
         
         try:
-            with sd.InputStream(
-                samplerate=self.porcupine_sample_rate,
-                channels=1,
-                dtype='int16',
-                callback=self.wake_word_callback,
-                blocksize=self.porcupine_frame_length
-            ):
+            with self.microphone:
                 print(f"🎧 Listening for '{WAKE_WORD.upper()}'...\n")
+                self.components.mark("listening_for_wake_word")
+                os.makedirs(os.path.dirname(STARTUP_REPORT_FILE), exist_ok=True)
+                self.components.report_when_loaded(STARTUP_REPORT_FILE)
                 
                 while self.is_running:
-                    # Collect audio
-                    while not self.wake_word_queue.empty():
-                        chunk = self.wake_word_queue.get()
-                        audio_buffer = np.append(audio_buffer, chunk.flatten())
-                    
-                    # Process frames
-                    while len(audio_buffer) >= self.porcupine_frame_length:
-                        frame = audio_buffer[:self.porcupine_frame_length]
-                        audio_buffer = audio_buffer[self.porcupine_frame_length:]
-                        
-                        keyword_index = self.porcupine.process(frame)
+                    if self.wait_for_wake_word():
+                        print(f"\n🎯 '{WAKE_WORD.upper()}' detected!")
                         
-                        if keyword_index >= 0:
-                            print(f"\n🎯 '{WAKE_WORD.upper()}' detected!")
-                            
-                            # Process command (handles both normal and conversation mode)
-                            self.process_command()
-                            
-                            # Clear buffer
-                            audio_buffer = np.array([], dtype=np.int16)
-                    
-                    time.sleep(0.01)
+                        # Process command (handles both normal and conversation mode);
+                        # recording starts on the next frame of the same stream
+                        self.process_command()
                     
         except KeyboardInterrupt:
             print("\n\n🛑 Shutting down JARVIS...")
@@ -564,13 +883,15 @@ Keep responses SHORT for natural conversation."""
             self.is_running = False
         finally:
             self.porcupine.delete()
+            if self.porcupine_playback is not None:
+                self.porcupine_playback.delete()
             self.stop_music()
+            self.speech_worker.close()
+            self.components.shutdown()
+            if self.components.is_ready("llm") and self.llm.cache is not None:
+                print(f"LLM cache: {self.llm.cache.metrics()}")
+            print(f"Microphone frames: {self.microphone.stats()}")
             pygame.mixer.quit()
-            if os.path.exists(self.tts_temp_file):
-                try:
-                    os.remove(self.tts_temp_file)
-                except:
-                    pass
 
 
 if __name__ == "__main__":
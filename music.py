@@ -0,0 +1,148 @@
+"""
+JARVIS Music Engine
+Pre-decoded tracks on a reserved mixer channel, with volume ducking under speech
+music.py
+"""
+
+import os
+import threading
+import time
+
+import pygame
+
+
+class MusicEngine:
+    """
+    Background music that never touches the disk after preload().
+    Tracks are decoded once into pygame Sounds and played on a reserved
+    channel, so switching is instant and TTS (which plays on the other
+    channels) can't steal it. While JARVIS speaks, the volume is ramped
+    down (duck) and back up (unduck) instead of pausing the stream; one
+    worker thread steps the volume for every ramp.
+    Create it after pygame.mixer.init() so the channel is reserved up front.
+    """
+
+    RAMP_STEP = 0.02  # seconds between volume steps
+
+    def __init__(self, tracks, volume=0.7, duck_volume=0.15, ramp_seconds=0.25,
+                 restore_delay=0.4, channel=0):
+        self.paths = {os.path.basename(path): path for path in tracks}
+        self.default = os.path.basename(tracks[0]) if tracks else None
+        self.volume = volume
+        self.duck_volume = duck_volume
+        self.ramp_seconds = ramp_seconds
+        self.restore_delay = restore_delay  # hold the duck briefly so back-to-back sentences don't pump
+        self.channel_id = channel
+        self.current = None
+        self._sounds = {}
+        self._channel = None
+        self._ducks = 0
+        self._level = volume   # volume the channel is at
+        self._target = volume  # volume the ramp worker is heading to
+        self._ramp_at = 0.0    # monotonic time the current ramp may start (restore delay)
+        self._lock = threading.Condition()
+        self._ramp_thread = None
+
+        # Reserve the channel before any TTS Sound.play() can pick it
+        if pygame.mixer.get_init():
+            self._get_channel()
+
+    def _get_channel(self):
+        if self._channel is None:
+            # Keep this channel out of Sound.play()'s automatic channel choice
+            pygame.mixer.set_reserved(self.channel_id + 1)
+            self._channel = pygame.mixer.Channel(self.channel_id)
+        return self._channel
+
+    def _load(self, name):
+        sound = self._sounds.get(name)
+        if sound is None:
+            sound = self._sounds[name] = pygame.mixer.Sound(self.paths[name])
+        return sound
+
+    def preload(self):
+        """Decode every available track (call in the background at startup)"""
+        self._get_channel()
+        for name, path in self.paths.items():
+            if os.path.exists(path):
+                self._load(name)
+            else:
+                print(f"⚠️  Warning: Music file not found: {path}")
+        print(f"✓ Music preloaded ({len(self._sounds)} tracks)")
+
+    def has_track(self, name=None):
+        name = os.path.basename(name) if name else self.default
+        return name in self.paths and (name in self._sounds or os.path.exists(self.paths[name]))
+
+    def play(self, name=None):
+        """Start (or switch to) a track, looping; returns False if it doesn't exist"""
+        name = os.path.basename(name) if name else self.default
+        if not self.has_track(name):
+            return False
+
+        sound = self._load(name)
+        channel = self._get_channel()
+        with self._lock:
+            # Start at the right level straight away (no ramp)
+            self._level = self._target = self.duck_volume if self._ducks else self.volume
+            channel.set_volume(self._level)
+        channel.play(sound, loops=-1)
+        self.current = name
+        return True
+
+    def stop(self, fade_ms=300):
+        if self._channel is not None and self.current is not None:
+            self._channel.fadeout(fade_ms)
+        self.current = None
+
+    @property
+    def is_playing(self):
+        return self.current is not None and self._channel is not None and self._channel.get_busy()
+
+    def duck(self):
+        """Lower the music under speech (nestable)"""
+        with self._lock:
+            self._ducks += 1
+            self._ramp_to(self.duck_volume)
+
+    def unduck(self):
+        """Undo one duck(); the volume comes back smoothly after restore_delay"""
+        with self._lock:
+            self._ducks = max(0, self._ducks - 1)
+            if not self._ducks:
+                self._ramp_to(self.volume, delay=self.restore_delay)
+
+    def _ramp_to(self, target, delay=0.0):
+        """Point the ramp worker at a new volume (call with the lock held)"""
+        self._target = target
+        self._ramp_at = time.monotonic() + delay
+        if not self.is_playing:
+            self._level = target  # nothing audible to ramp; play() starts here
+            return
+        if self._ramp_thread is None:
+            self._ramp_thread = threading.Thread(target=self._ramp_worker, name="music-ramp", daemon=True)
+            self._ramp_thread.start()
+        self._lock.notify()
+
+    def _ramp_worker(self):
+        """Steps the channel volume toward the current target, one RAMP_STEP at a time"""
+        steps = max(1, int(self.ramp_seconds / self.RAMP_STEP))
+        step = abs(self.volume - self.duck_volume) / steps or 1.0
+        with self._lock:
+            while True:
+                if self._level == self._target:
+                    self._lock.wait()
+                    continue
+                delay = self._ramp_at - time.monotonic()
+                if delay > 0:
+                    # Restore delay; a duck() meanwhile changes the target and wakes us
+                    self._lock.wait(delay)
+                    continue
+
+                if self._level < self._target:
+                    self._level = min(self._target, self._level + step)
+                else:
+                    self._level = max(self._target, self._level - step)
+                if self._channel is not None:
+                    self._channel.set_volume(self._level)
+                self._lock.wait(self.RAMP_STEP)
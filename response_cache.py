@@ -0,0 +1,201 @@
+"""
+JARVIS Response Cache
+LLM answers for repeated questions: normalized question + context fingerprint,
+TTL, in-memory LRU and a persistent SQLite tier
+response_cache.py
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Answers to these depend on when they are asked
+VOLATILE_WORDS = {"today", "tonight", "tomorrow", "yesterday", "now", "time", "date",
+                  "weather", "news", "latest", "current", "currently"}
+
+FILLER_PREFIXES = ("hey jarvis", "jarvis", "please", "can you tell me", "could you tell me",
+                   "tell me", "um", "uh")
+
+
+def normalize_question(text):
+    """'Jarvis, what is Newton's second law?' -> 'what is newtons second law'"""
+    text = text.lower().replace("'", "")
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in FILLER_PREFIXES:
+            if text == prefix or text.startswith(prefix + " "):
+                text = text[len(prefix):].strip()
+                stripped = True
+    return text
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM answers.
+    The key is the normalized last user message plus a fingerprint of the
+    system prompt, the few messages before it and the request parameters,
+    so follow-up questions in a different context don't collide.
+    Entries expire after ttl seconds; the memory tier is an LRU of
+    max_entries, the SQLite tier keeps up to max_disk_entries (LRU by last use).
+    SQLite errors (read-only or locked file, full disk) never reach the
+    caller: a failed lookup is a miss, a failed store stays in memory only
+    """
+
+    def __init__(self, path=None, ttl=7 * 24 * 3600, max_entries=256, max_disk_entries=5000,
+                 context_messages=2):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.context_messages = context_messages
+        self._memory = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                      "expired": 0, "evictions": 0, "disk_errors": 0, "lookup_seconds": 0.0}
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT, expires_at REAL, last_used REAL)"
+                )
+                self._db.commit()
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  Response cache {path} unavailable, keeping answers in memory only: {e}")
+                self.close()
+
+    def key(self, messages, model, params):
+        """Cache key for a request, or None if it shouldn't be cached"""
+        if not messages or messages[-1]["role"] != "user":
+            return None
+        question = normalize_question(messages[-1]["content"])
+        if not question or VOLATILE_WORDS.intersection(question.split()):
+            return None
+
+        system = [m["content"] for m in messages if m["role"] == "system"]
+        recent = [(m["role"], m["content"]) for m in messages[:-1] if m["role"] != "system"]
+        recent = recent[-self.context_messages:] if self.context_messages else []
+        context = json.dumps([model, sorted(params.items()), system, recent], default=str)
+        fingerprint = hashlib.sha256(context.encode("utf-8")).hexdigest()[:16]
+        return f"{fingerprint}:{question}"
+
+    def get(self, key):
+        """Cached answer or None"""
+        start = time.perf_counter()
+        now = time.time()
+        try:
+            with self._lock:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    expires_at, text = entry
+                    if expires_at > now:
+                        self._memory.move_to_end(key)
+                        self.stats["hits"] += 1
+                        return text
+                    del self._memory[key]
+                    self.stats["expired"] += 1
+
+                if self._db is not None:
+                    try:
+                        text = self._disk_get(key, now)
+                    except sqlite3.Error as e:
+                        self._disk_error("lookup", e)
+                        text = None
+                    if text is not None:
+                        return text
+
+                self.stats["misses"] += 1
+                return None
+        finally:
+            self.stats["lookup_seconds"] += time.perf_counter() - start
+
+    def _disk_get(self, key, now):
+        row = self._db.execute(
+            "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        text, expires_at = row
+        if expires_at > now:
+            # The hit is served from memory even if recording last_used fails
+            self._remember(key, expires_at, text)
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            try:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._disk_error("update", e)
+            return text
+        self.stats["expired"] += 1
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._db.commit()
+        return None
+
+    def put(self, key, text):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, text)
+            self.stats["stores"] += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, expires_at, last_used) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, text, expires_at, now)
+                    )
+                    self._evict_disk(now)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._disk_error("store", e)
+
+    def _disk_error(self, action, error):
+        """Count and log a failed SQLite operation and roll back its transaction"""
+        self.stats["disk_errors"] += 1
+        print(f"⚠️  Response cache {action} failed: {error}")
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key, expires_at, text):
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+            self.stats["evictions"] += count - self.max_disk_entries
+
+    def metrics(self):
+        """Hit/miss counters plus hit rate and mean lookup time"""
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["mean_lookup_us"] = stats["lookup_seconds"] / lookups * 1e6 if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
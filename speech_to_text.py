@@ -0,0 +1,447 @@
+"""
+JARVIS Speech-to-Text Module
+In-memory Whisper transcription shared by the voice loop and the web app
+speech_to_text.py
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_WINDOW_SECONDS = 30  # audio the encoder sees at once; longer clips can't be batched
+
+
+def to_whisper_audio(samples, sample_rate):
+    """
+    Convert a numpy buffer to what Whisper expects: mono float32 at 16kHz.
+    float32 input that is already mono 16kHz is returned as-is (no copy)
+    """
+    audio = np.asarray(samples)
+
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768.0
+    elif audio.dtype != np.float32:
+        audio = audio.astype(np.float32)
+
+    if audio.ndim > 1:
+        # (frames, channels) -> mono
+        audio = audio.mean(axis=1, dtype=np.float32)
+
+    if sample_rate != WHISPER_SAMPLE_RATE and len(audio):
+        duration = len(audio) / sample_rate
+        target_length = int(round(duration * WHISPER_SAMPLE_RATE))
+        source_times = np.arange(len(audio)) / sample_rate
+        target_times = np.arange(target_length) / WHISPER_SAMPLE_RATE
+        audio = np.interp(target_times, source_times, audio).astype(np.float32)
+
+    return audio
+
+
+class SpeechTranscriber:
+    def __init__(self, model_size="base", device="cpu", **model_options):
+        # Imported here: faster_whisper pulls in ctranslate2 and PyAV
+        from faster_whisper import WhisperModel
+
+        print(f"Loading Whisper model ({model_size})...")
+        self.model = WhisperModel(model_size, device=device, **model_options)
+        self.model_size = model_size
+        print(f"✓ Speech-to-Text initialized (Whisper {model_size} on {device})")
+
+    def transcribe_segments(self, samples, sample_rate, beam_size=5, language="en", vad_filter=True,
+                            **options):
+        """
+        Transcribe a numpy audio buffer without touching the disk
+        Returns: list of Whisper segments (times relative to the buffer start)
+        """
+        audio = to_whisper_audio(samples, sample_rate)
+
+        segments, info = self.model.transcribe(
+            audio,
+            beam_size=beam_size,
+            language=language,
+            vad_filter=vad_filter,
+            **options
+        )
+
+        return list(segments)
+
+    def transcribe_array(self, samples, sample_rate, **options):
+        """
+        Transcribe a numpy audio buffer without touching the disk
+        Returns: transcribed text
+        """
+        segments = self.transcribe_segments(samples, sample_rate, **options)
+        return " ".join([segment.text.strip() for segment in segments])
+
+    def transcribe_batch(self, clips, beam_size=5, language="en", no_speech_threshold=0.6,
+                         log_prob_threshold=-1.0):
+        """
+        Transcribe independent 16kHz float32 clips (up to one Whisper window each)
+        in a single batched encode + generate. Every clip is its own batch item with
+        its own features and prompt, so no audio or text crosses between clips
+        Returns: text of each clip, in order
+        """
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.transcribe import get_suppressed_tokens
+
+        model = self.model
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                              task="transcribe", language=language)
+        features = np.stack([pad_or_trim(model.feature_extractor(clip)[..., :-1]) for clip in clips])
+        prompt = model.get_prompt(tokenizer, [], without_timestamps=True)
+
+        results = model.model.generate(
+            model.encode(features),
+            [list(prompt) for _ in clips],
+            beam_size=beam_size,
+            max_length=model.max_length,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+            return_scores=True,
+            return_no_speech_prob=True,
+        )
+
+        texts = []
+        for result in results:
+            tokens = result.sequences_ids[0]
+            avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+            # Same silence rule as WhisperModel.transcribe
+            if result.no_speech_prob > no_speech_threshold and avg_logprob < log_prob_threshold:
+                texts.append("")
+            else:
+                texts.append(tokenizer.decode(tokens).strip())
+        return texts
+
+
+class StreamingTranscription:
+    """
+    Incremental transcription of a recording that is still growing.
+    Overlapping windows (from the last committed point to the newest audio)
+    are decoded in the background while the user speaks. Segments that end
+    well before the edge of the window are committed, so when the endpoint
+    fires only the short uncommitted tail is left to decode.
+    """
+
+    def __init__(self, transcriber, sample_rate=WHISPER_SAMPLE_RATE, step=1.0,
+                 stable_margin=1.0, max_window=10.0, **options):
+        self.transcriber = transcriber
+        self.sample_rate = sample_rate
+        self.step_samples = int(step * sample_rate)
+        self.stable_margin = stable_margin  # seconds at the window edge that may still change
+        self.max_window = max_window        # force a commit once the window gets this long
+        self.options = options
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-stream")
+        self.start()
+
+    def start(self, on_partial=None):
+        """Begin a new utterance"""
+        self.on_partial = on_partial
+        self._committed_text = []
+        self._committed_samples = 0
+        self._last_submitted = 0
+        self._pending = None
+
+    def update(self, audio):
+        """
+        Feed the recording so far (e.g. a view of the capture buffer).
+        Never blocks: a new window is submitted only when the previous one is done
+        """
+        if self._pending is not None:
+            if not self._pending.done():
+                return
+            self._apply(self._pending.result())
+            self._pending = None
+
+        end = len(audio)
+        if end - self._last_submitted < self.step_samples:
+            return
+
+        self._last_submitted = end
+        start = self._committed_samples
+        self._pending = self._executor.submit(self._decode, audio[start:end], start, end)
+
+    def finalize(self, audio):
+        """Decode whatever is not committed yet and return the full text"""
+        if self._pending is not None:
+            self._apply(self._pending.result())
+            self._pending = None
+
+        text = list(self._committed_text)
+        if len(audio) - self._committed_samples > 0:
+            segments = self.transcriber.transcribe_segments(
+                audio[self._committed_samples:], self.sample_rate, **self.options
+            )
+            text.extend(segment.text.strip() for segment in segments)
+
+        self.start()
+        return " ".join(part for part in text if part)
+
+    def cancel(self):
+        """Drop the current utterance (waits for an in-flight window)"""
+        if self._pending is not None:
+            self._pending.result()
+        self.start()
+
+    def _decode(self, window, start, end):
+        """Runs on the worker thread"""
+        segments = self.transcriber.transcribe_segments(window, self.sample_rate, **self.options)
+        return start, end, segments
+
+    def _apply(self, result):
+        """Commit stable segments and report the partial hypothesis"""
+        start, end, segments = result
+        window_duration = (end - start) / self.sample_rate
+        stable_until = window_duration - self.stable_margin
+
+        committed = 0
+        while committed < len(segments) and segments[committed].end <= stable_until:
+            committed += 1
+
+        # Long window with no stable point yet: keep everything but the last segment
+        if committed == 0 and window_duration > self.max_window and len(segments) > 1:
+            committed = len(segments) - 1
+
+        if committed:
+            self._committed_text.extend(segment.text.strip() for segment in segments[:committed])
+            self._committed_samples = min(end, start + int(segments[committed - 1].end * self.sample_rate))
+
+        if self.on_partial:
+            tail = [segment.text.strip() for segment in segments[committed:]]
+            partial = " ".join(part for part in self._committed_text + tail if part)
+            if partial:
+                self.on_partial(partial)
+
+
+class AudioTooLong(ValueError):
+    """decode_audio_file passed max_seconds (decoding stopped there)"""
+
+
+def decode_audio_file(file, max_seconds=None):
+    """
+    Decode an uploaded audio file (path or binary file object, any format
+    PyAV/FFmpeg reads) to mono float32 at 16kHz.
+    Decoding stops with AudioTooLong as soon as the audio passes max_seconds,
+    so a long or highly compressed upload can't run away with memory and CPU
+    """
+    import av
+    from av.audio.resampler import AudioResampler
+
+    limit = None if max_seconds is None else int(max_seconds * WHISPER_SAMPLE_RATE)
+    resampler = AudioResampler(format="s16", layout="mono", rate=WHISPER_SAMPLE_RATE)
+    chunks = []
+    samples = 0
+    with av.open(file, mode="r", metadata_errors="ignore") as container:
+        # None at the end flushes the resampler
+        for frame in itertools.chain(container.decode(audio=0), [None]):
+            for resampled in resampler.resample(frame):
+                chunk = resampled.to_ndarray().reshape(-1)
+                chunks.append(chunk)
+                samples += len(chunk)
+            if limit is not None and samples > limit:
+                raise AudioTooLong(f"audio longer than {max_seconds} seconds")
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+
+class TranscriptionQueueFull(Exception):
+    """The worker pool's queue is at max_queue; retry later"""
+
+
+class _Request:
+    __slots__ = ("audio", "future", "submitted")
+
+    def __init__(self, audio):
+        self.audio = audio
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+
+class WhisperWorkerPool:
+    """
+    One Whisper model shared by many callers (e.g. Flask request handlers).
+    Requests wait in a bounded queue; submit() raises TranscriptionQueueFull
+    instead of letting the backlog grow. Each worker takes up to batch_size
+    waiting clips and decodes them as separate items of one batch
+    (SpeechTranscriber.transcribe_batch), so callers share the encoder and
+    decoder passes but never each other's audio or text. A clip waiting alone,
+    or one longer than a Whisper window, gets the regular transcribe path.
+    The model is created with num_workers=workers so the worker threads
+    decode in parallel
+    """
+
+    def __init__(self, transcriber=None, model_size="base", device="cpu", workers=1, max_queue=16,
+                 batch_size=8, beam_size=5, language="en"):
+        self.transcriber = transcriber or SpeechTranscriber(model_size, device=device, num_workers=workers)
+        self.max_queue = max_queue
+        # Batching needs a fixed language: every item shares the prompt
+        self.batch_size = batch_size if language else 1
+        self.options = {"beam_size": beam_size, "language": language}
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._busy = 0
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "batches": 0,
+                      "audio_seconds": 0.0, "decode_seconds": 0.0, "wait_seconds": 0.0}
+        self._threads = [threading.Thread(target=self._worker, name=f"whisper-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, samples, sample_rate=WHISPER_SAMPLE_RATE):
+        """Queue a clip; returns a Future of its text"""
+        request = _Request(to_whisper_audio(samples, sample_rate))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("WhisperWorkerPool is shut down")
+            if len(self._queue) >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise TranscriptionQueueFull(f"{len(self._queue)} requests already waiting")
+            self._queue.append(request)
+            self.stats["submitted"] += 1
+            self._condition.notify()
+        return request.future
+
+    def transcribe(self, samples, sample_rate=WHISPER_SAMPLE_RATE, timeout=None):
+        """Blocking submit(); on timeout the request is dropped if it hasn't started"""
+        future = self.submit(samples, sample_rate)
+        try:
+            return future.result(timeout)
+        finally:
+            future.cancel()  # no-op unless it is still queued
+
+    def _next_batch(self):
+        """
+        Oldest waiting requests that can share one batch, in order (None once shut down).
+        Taking stops at the first clip longer than a Whisper window; such a clip
+        is always decoded on its own
+        """
+        window = WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE
+        with self._condition:
+            while True:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return None
+
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    request = self._queue[0]
+                    if batch and (len(request.audio) > window or len(batch[0].audio) > window):
+                        break
+                    self._queue.popleft()
+                    if request.future.set_running_or_notify_cancel():
+                        batch.append(request)
+                if batch:
+                    self._busy += 1
+                    return batch
+
+    def _decode(self, batch):
+        """Text of each clip in the batch"""
+        if len(batch) == 1:
+            segments = self.transcriber.transcribe_segments(batch[0].audio, WHISPER_SAMPLE_RATE,
+                                                            **self.options)
+            return [" ".join(segment.text.strip() for segment in segments).strip()]
+        return self.transcriber.transcribe_batch([request.audio for request in batch], **self.options)
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            start = time.monotonic()
+            try:
+                texts = self._decode(batch)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                failed = True
+            else:
+                for request, text in zip(batch, texts):
+                    request.future.set_result(text)
+                failed = False
+
+            decode_seconds = time.monotonic() - start
+            with self._condition:
+                self._busy -= 1
+                self.stats["batches"] += 1
+                self.stats["failed" if failed else "completed"] += len(batch)
+                self.stats["decode_seconds"] += decode_seconds
+                self.stats["audio_seconds"] += sum(len(r.audio) for r in batch) / WHISPER_SAMPLE_RATE
+                self.stats["wait_seconds"] += sum(start - r.submitted for r in batch)
+
+    def metrics(self):
+        """Queue depth, throughput and latency counters"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._queue)
+            stats["max_queue"] = self.max_queue
+            stats["busy_workers"] = self._busy
+            stats["workers"] = len(self._threads)
+        done = stats["completed"] + stats["failed"]
+        stats["mean_batch_size"] = done / stats["batches"] if stats["batches"] else 0.0
+        stats["mean_wait_seconds"] = stats["wait_seconds"] / done if done else 0.0
+        stats["real_time_factor"] = (stats["decode_seconds"] / stats["audio_seconds"]
+                                     if stats["audio_seconds"] else 0.0)
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stop the workers; requests still queued fail with RuntimeError"""
+        with self._condition:
+            self._closed = True
+            pending = list(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+        for request in pending:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("WhisperWorkerPool shut down"))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+_shared_transcribers = {}  # (model_size, device, model_options) -> SpeechTranscriber
+_shared_lock = threading.Lock()
+
+
+def get_transcriber(model_size="base", device="cpu", **model_options):
+    """Get the process-wide SpeechTranscriber for these settings (each loaded once, on first use)"""
+    key = (model_size, device, tuple(sorted(model_options.items())))
+    with _shared_lock:
+        transcriber = _shared_transcribers.get(key)
+        if transcriber is None:
+            transcriber = _shared_transcribers[key] = SpeechTranscriber(model_size, device=device,
+                                                                        **model_options)
+        return transcriber
+
+
+def transcribe_array(samples, sample_rate):
+    """Transcribe a numpy audio buffer with the first transcriber loaded (or the default one)"""
+    with _shared_lock:
+        transcriber = next(iter(_shared_transcribers.values()), None)
+    if transcriber is None:
+        transcriber = get_transcriber()
+    return transcriber.transcribe_array(samples, sample_rate)
+
+
+_shared_pool = None
+
+
+def get_worker_pool(create=True, **options):
+    """
+    Get the process-wide WhisperWorkerPool, loading it on first use with these options
+    (None if it isn't loaded yet and create is False)
+    """
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None and create:
+            _shared_pool = WhisperWorkerPool(**options)
+        return _shared_pool
\ No newline at end of file
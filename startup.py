@@ -0,0 +1,158 @@
+"""
+JARVIS Startup
+Concurrent and deferred component loading with a per-component startup report
+startup.py
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import psutil
+
+
+class ComponentLoader:
+    """
+    Loads the assistant's components.
+    run() loads now on the calling thread, submit() loads in the background
+    and defer() waits until the component is first needed. get(name) returns
+    the component, blocking only if it is still loading.
+    Every load records its wall time and the process RSS growth while it ran;
+    loads that overlap share that growth, so their RSS deltas are approximate.
+    """
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures = {}
+        self._deferred = {}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._started = time.perf_counter()
+        self._start_rss = self._process.memory_info().rss
+        self.records = {}
+        self.milestones = {}
+
+    def _load(self, name, loader, args, kwargs):
+        rss_before = self._process.memory_info().rss
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            component = loader(*args, **kwargs)
+            status = "ok"
+            return component
+        finally:
+            self.records[name] = {
+                "component": name,
+                "started": round(start - self._started, 3),
+                "seconds": round(time.perf_counter() - start, 3),
+                "rss_delta_mb": round((self._process.memory_info().rss - rss_before) / 1048576, 1),
+                "thread": threading.current_thread().name,
+                "status": status,
+            }
+
+    def run(self, name, loader, *args, **kwargs):
+        """Load now on this thread"""
+        future = Future()
+        with self._lock:
+            self._futures[name] = future
+        try:
+            future.set_result(self._load(name, loader, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future.result()
+
+    def submit(self, name, loader, *args, **kwargs):
+        """Start loading in the background"""
+        with self._lock:
+            self._futures[name] = self._executor.submit(self._load, name, loader, args, kwargs)
+
+    def defer(self, name, loader, *args, **kwargs):
+        """Load on the first get(name)"""
+        with self._lock:
+            self._deferred[name] = (loader, args, kwargs)
+
+    def get(self, name):
+        """The loaded component (waits for a background load, runs a deferred one)"""
+        with self._lock:
+            future = self._futures.get(name)
+            deferred = None
+            if future is None:
+                deferred = self._deferred.pop(name)
+                future = self._futures[name] = Future()
+
+        if deferred is not None:
+            loader, args, kwargs = deferred
+            try:
+                future.set_result(self._load(name, loader, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+    def is_ready(self, name):
+        with self._lock:
+            future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def mark(self, milestone):
+        """Record when a point in startup was reached (e.g. listening for the wake word)"""
+        self.milestones[milestone] = round(time.perf_counter() - self._started, 3)
+
+    def wait_all(self):
+        """Wait for every background load (errors are left to get())"""
+        with self._lock:
+            futures = list(self._futures.values())
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    def report(self):
+        """Startup report as a dict: one row per component plus milestones"""
+        rows = sorted(self.records.values(), key=lambda row: row["started"])
+        with self._lock:
+            rows += [{"component": name, "status": "deferred"} for name in self._deferred]
+        return {
+            "components": rows,
+            "milestones": dict(self.milestones),
+            "elapsed": round(time.perf_counter() - self._started, 3),
+            "rss_mb": round(self._process.memory_info().rss / 1048576, 1),
+            "rss_delta_mb": round((self._process.memory_info().rss - self._start_rss) / 1048576, 1),
+        }
+
+    def print_report(self, path=None):
+        """Print the startup report (and append it as JSON to path, if given)"""
+        report = self.report()
+
+        print(f"\n{'─'*60}")
+        print("⏱️  Startup report")
+        print(f"{'component':<20}{'start':>8}{'time':>8}{'RSS Δ':>10}  status")
+        for row in report["components"]:
+            if row["status"] == "deferred":
+                print(f"{row['component']:<20}{'':>8}{'':>8}{'':>10}  deferred")
+            else:
+                print(f"{row['component']:<20}{row['started']:>7.2f}s{row['seconds']:>7.2f}s"
+                      f"{row['rss_delta_mb']:>7.1f} MB  {row['status']}")
+        for milestone, at in report["milestones"].items():
+            print(f"→ {milestone} at {at:.2f}s")
+        print(f"Total {report['elapsed']:.2f}s, RSS {report['rss_mb']:.0f} MB (+{report['rss_delta_mb']:.0f} MB)")
+        print(f"{'─'*60}\n")
+
+        if path:
+            with open(path, "a") as f:
+                f.write(json.dumps(report) + "\n")
+
+        return report
+
+    def report_when_loaded(self, path=None):
+        """Print the report from a background thread once every submitted load has finished"""
+        def report():
+            self.wait_all()
+            self.print_report(path)
+
+        threading.Thread(target=report, name="startup-report", daemon=True).start()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,540 @@
+"""
+JARVIS Text-to-Speech Module
+Streaming edge-tts synthesis: MP3 chunks are decoded and played as they arrive,
+with a persistent cache for phrases JARVIS says over and over
+text_to_speech.py
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import av
+import edge_tts
+import pygame
+
+
+class Mp3StreamDecoder:
+    """Incremental MP3 -> PCM decoder producing the pygame mixer's sample format"""
+
+    def __init__(self, rate, channels):
+        self._codec = av.CodecContext.create("mp3", "r")
+        self._resampler = av.AudioResampler(
+            format="s16",
+            layout="stereo" if channels == 2 else "mono",
+            rate=rate
+        )
+
+    def _convert(self, frames):
+        pcm = []
+        for frame in frames:
+            for out in self._resampler.resample(frame):
+                pcm.append(out.to_ndarray().tobytes())
+        return b"".join(pcm)
+
+    def _decode_packet(self, packet):
+        try:
+            return self._convert(self._codec.decode(packet))
+        except av.error.InvalidDataError:
+            # Tags or a damaged frame: skip it, the next frame resyncs
+            return b""
+
+    def decode(self, data):
+        """Feed MP3 bytes; returns whatever PCM could be decoded so far (may be empty)"""
+        pcm = []
+        for packet in self._codec.parse(data):
+            pcm.append(self._decode_packet(packet))
+        return b"".join(pcm)
+
+    def flush(self):
+        """Decode anything still buffered at the end of the stream"""
+        pcm = []
+        for packet in self._codec.parse(None):
+            pcm.append(self._decode_packet(packet))
+        pcm.append(self._convert(self._codec.decode(None)))
+        for out in self._resampler.resample(None):
+            pcm.append(out.to_ndarray().tobytes())
+        return b"".join(pcm)
+
+
+class PhraseCache:
+    """
+    Content-addressed cache of synthesized speech, keyed by (text, voice, rate).
+    MP3 bytes are kept on disk and decoded Sounds in memory; both tiers are
+    size-bounded with least-recently-used eviction.
+    """
+
+    def __init__(self, directory, max_disk_bytes=50 * 1024 * 1024, max_memory_bytes=32 * 1024 * 1024):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()  # key -> (Sound, pcm size)
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha256(f"{voice}\n{rate}\n{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".mp3")
+
+    def contains(self, key):
+        return key in self._memory or os.path.exists(self._path(key))
+
+    def get_sound(self, key):
+        """Cached Sound for key (memory first, then disk) or None"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key][0]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mp3 = f.read()
+            os.utime(path)  # mtime doubles as the disk tier's LRU clock
+        except OSError:
+            self.misses += 1
+            return None
+
+        sound = self._remember(key, decode_mp3(mp3))
+        self.hits += 1
+        return sound
+
+    def put(self, key, mp3, pcm=None):
+        """Store synthesized MP3 bytes (and the decoded PCM if already available)"""
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(mp3)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+            return None
+
+        self._evict_disk()
+        return self._remember(key, pcm if pcm is not None else decode_mp3(mp3))
+
+    def _remember(self, key, pcm):
+        sound = pygame.mixer.Sound(buffer=pcm)
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (sound, len(pcm))
+        self._memory_bytes += len(pcm)
+
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, (_, size) = self._memory.popitem(last=False)
+            self._memory_bytes -= size
+        return sound
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
+
+
+def decode_mp3(mp3):
+    """Decode a complete MP3 into PCM bytes in the mixer's format"""
+    frequency, size, channels = pygame.mixer.get_init()
+    decoder = Mp3StreamDecoder(frequency, channels)
+    return decoder.decode(mp3) + decoder.flush()
+
+
+class StreamingSpeech:
+    """
+    Speak text with edge-tts without waiting for the whole MP3.
+    The first decoded chunk starts playing immediately; later audio is
+    batched into short Sounds and queued on the same channel back to back.
+    """
+
+    def __init__(self, voice, rate, min_chunk_seconds=0.25, cache=None, on_audio_start=None):
+        self.voice = voice
+        self.rate = rate
+        self.min_chunk_seconds = min_chunk_seconds
+        self.cache = cache
+        self.on_audio_start = on_audio_start  # called when an utterance's first audio starts playing
+        self._channel = None
+        self._stopped = False
+        self._prefetched = {}  # (text, cache) -> _Prefetch started before its turn
+        self._ends_at = 0.0  # monotonic time the queued audio runs out
+        print(f"✓ Text-to-Speech initialized (streaming, voice: {voice}, cache: {'on' if cache else 'off'})")
+
+    def _mixer_format(self):
+        frequency, size, channels = pygame.mixer.get_init()
+        bytes_per_second = frequency * channels * abs(size) // 8
+        return frequency, channels, bytes_per_second
+
+    async def synthesize(self, text, cache_key=None):
+        """
+        Async generator of pygame Sounds for text, in playback order.
+        With a cache_key, the complete result is stored in the phrase cache
+        """
+        frequency, channels, bytes_per_second = self._mixer_format()
+        min_bytes = int(self.min_chunk_seconds * bytes_per_second)
+        decoder = Mp3StreamDecoder(frequency, channels)
+        communicate = edge_tts.Communicate(text, self.voice, rate=self.rate)
+
+        pending = bytearray()
+        first = True
+        keep = cache_key is not None and self.cache is not None
+        mp3 = bytearray()
+        pcm = bytearray()
+
+        async for chunk in communicate.stream():
+            if chunk["type"] != "audio":
+                continue
+
+            if keep:
+                mp3 += chunk["data"]
+            pending += decoder.decode(chunk["data"])
+
+            # First audio goes out as soon as anything decodes; then batch
+            if pending and (first or len(pending) >= min_bytes):
+                if keep:
+                    pcm += pending
+                yield pygame.mixer.Sound(buffer=bytes(pending))
+                pending.clear()
+                first = False
+
+        pending += decoder.flush()
+        if keep:
+            pcm += pending
+        if pending:
+            yield pygame.mixer.Sound(buffer=bytes(pending))
+
+        if keep and mp3:
+            self.cache.put(cache_key, bytes(mp3), bytes(pcm))
+
+    def _feed(self, channel, backlog):
+        """Keep the channel playing / its one-slot queue filled"""
+        if self._stopped:
+            backlog.clear()
+            return channel
+
+        now = time.monotonic()
+        if channel is None or not channel.get_busy():
+            if backlog:
+                started = backlog[0].play()
+                if started is not None:
+                    sound = backlog.popleft()
+                    if channel is None and self.on_audio_start:
+                        self.on_audio_start()
+                    channel = self._channel = started
+                    self._ends_at = now + sound.get_length()
+        elif backlog and channel.get_queue() is None:
+            sound = backlog.popleft()
+            channel.queue(sound)
+            self._ends_at = max(self._ends_at, now) + sound.get_length()
+        return channel
+
+    async def play(self, sounds):
+        """Play an async iterator of Sounds gaplessly; returns when playback ends"""
+        channel = None
+        backlog = deque()
+
+        try:
+            async for sound in sounds:
+                backlog.append(sound)
+                channel = self._feed(channel, backlog)
+
+            while backlog or (channel is not None and channel.get_busy()):
+                channel = self._feed(channel, backlog)
+                if backlog:
+                    # Refill the channel's queue slot as soon as it frees up
+                    await asyncio.sleep(0.02)
+                else:
+                    # Nothing left to queue: sleep until the audio should be done
+                    await asyncio.sleep(max(0.01, self._ends_at - time.monotonic()))
+        except BaseException:
+            # Cancelled (or synthesis failed) mid-utterance: don't leave audio playing
+            if channel is not None:
+                channel.stop()
+            raise
+        finally:
+            self._channel = None
+
+    def stop(self):
+        """
+        Stop playback immediately (safe to call from any thread).
+        Playback stays stopped until resume(), so an utterance that starts
+        while the cancel is still pending stays silent
+        """
+        self._stopped = True
+        channel = self._channel
+        if channel is not None:
+            channel.stop()
+
+    def resume(self):
+        """Allow playback again once a stop() has been handled (on the loop)"""
+        self._stopped = False
+
+    def _cache_key(self, text, cache):
+        if cache and self.cache is not None:
+            return PhraseCache.key(text, self.voice, self.rate)
+        return None
+
+    def prefetch(self, text, cache=True):
+        """
+        Start synthesizing text now, while earlier utterances are still playing.
+        Must be called on the event loop that will later speak() it
+        """
+        cache_key = self._cache_key(text, cache)
+        if cache_key is not None and self.cache.contains(cache_key):
+            return  # a cache hit is already instant
+        if (text, cache) not in self._prefetched:
+            self._prefetched[(text, cache)] = _Prefetch(self.synthesize(text, cache_key))
+
+    def discard_prefetched(self):
+        """Abandon synthesis started by prefetch()"""
+        for prefetch in self._prefetched.values():
+            prefetch.cancel()
+        self._prefetched.clear()
+
+    async def speak(self, text, cache=True):
+        """
+        Play text: straight from the phrase cache when possible, otherwise
+        synthesized and played starting with the first chunk
+        """
+        prefetch = self._prefetched.pop((text, cache), None)
+        if prefetch is not None:
+            await self.play(prefetch.sounds())
+            return
+
+        cache_key = self._cache_key(text, cache)
+        if cache_key is not None:
+            sound = self.cache.get_sound(cache_key)
+            if sound is not None:
+                await self.play(_single(sound))
+                return
+
+        await self.play(self.synthesize(text, cache_key))
+
+    async def _warm_one(self, text, limit):
+        key = PhraseCache.key(text, self.voice, self.rate)
+        if self.cache.contains(key):
+            return
+        async with limit:
+            try:
+                async for _ in self.synthesize(text, key):
+                    pass
+            except Exception as e:
+                print(f"TTS warm-up failed for '{text}': {e}")
+
+    async def warm(self, phrases, concurrency=4):
+        """Pre-synthesize phrases that are not in the cache yet"""
+        if self.cache is None:
+            return
+        limit = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(self._warm_one(text, limit) for text in dict.fromkeys(phrases)))
+
+
+async def _single(sound):
+    yield sound
+
+
+class _Prefetch:
+    """Runs a synthesis generator ahead of playback, buffering its Sounds"""
+
+    def __init__(self, sounds):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._pump(sounds))
+
+    async def _pump(self, sounds):
+        try:
+            async for sound in sounds:
+                self._queue.put_nowait(sound)
+        except Exception as e:
+            self._queue.put_nowait(e)
+        finally:
+            self._queue.put_nowait(None)
+
+    async def sounds(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self):
+        self._task.cancel()
+
+
+class SentenceSplitter:
+    """
+    Cuts streamed text into sentences as soon as each one is complete,
+    so the first sentence can be spoken while the rest is still generating
+    """
+
+    _BOUNDARY = re.compile(r'([.!?]+["\')\]]*)\s+|\n+')
+    _ABBREVIATIONS = ("mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "e.g.", "i.e.", "etc.")
+
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars  # shorter fragments are merged into the next sentence
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add streamed text; returns the sentences completed by it"""
+        self._buffer += text
+        sentences = []
+        start = 0
+
+        for match in self._BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            if candidate.lower().endswith(self._ABBREVIATIONS):
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Whatever is left once the stream ends"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest
+
+
+class SpeechWorker:
+    """
+    Long-lived speech thread with its own persistent asyncio loop.
+    Utterances are queued and spoken in order. say() returns at once with a
+    Future, say_and_wait() blocks until playback ends, and cancel() stops the
+    current utterance and drops everything queued.
+    """
+
+    def __init__(self, speak, stop=None, prefetch=None, discard=None, resume=None):
+        self._speak = speak        # coroutine function (text, cache)
+        self._stop = stop          # stops audio immediately from the calling thread
+        self._prefetch = prefetch  # starts synthesis of a queued utterance early (on the loop)
+        self._discard = discard    # drops early synthesis on cancel (on the loop)
+        self._resume = resume      # re-enables audio once the cancel is done (on the loop)
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._current = None
+        self.current_text = None  # utterance being spoken right now
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        self._loop.run_until_complete(self._serve())
+        self._loop.close()
+
+    async def _serve(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            text, cache, future = item
+            if not future.set_running_or_notify_cancel():
+                self._finished()
+                continue
+
+            self.current_text = text
+            self._current = asyncio.ensure_future(self._speak(text, cache))
+            try:
+                await self._current
+                future.set_result(True)
+            except asyncio.CancelledError:
+                future.set_result(False)  # interrupted by cancel()
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._current = None
+                self.current_text = None
+                self._finished()
+
+    def _finished(self):
+        with self._lock:
+            self._outstanding -= 1
+
+    def say(self, text, cache=True):
+        """Queue text and return immediately; the Future resolves when playback ends"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._outstanding += 1
+        if self._prefetch:
+            self._loop.call_soon_threadsafe(self._prefetch, text, cache)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (text, cache, future))
+        return future
+
+    def say_and_wait(self, text, cache=True):
+        """Speak text and block until playback ends; False if it was cancelled"""
+        try:
+            return self.say(text, cache).result()
+        except concurrent.futures.CancelledError:
+            return False
+
+    def run(self, coroutine):
+        """Run a coroutine on the worker's loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def is_busy(self):
+        """True while anything is playing or queued"""
+        with self._lock:
+            return self._outstanding > 0
+
+    def cancel(self):
+        """Stop the current utterance and drop everything queued"""
+        if self._stop:
+            self._stop()
+        self._loop.call_soon_threadsafe(self._cancel_all)
+
+    def _cancel_all(self):
+        closing = False
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                closing = True  # close() was called; keep going, it may not be last
+                continue
+            item[2].cancel()
+            self._finished()
+        if closing:
+            self._queue.put_nowait(None)
+        if self._discard:
+            self._discard()
+        if self._current is not None:
+            self._current.cancel()
+        if self._resume:
+            self._resume()
+
+    def close(self, timeout=5):
+        """Finish what is queued, then stop the thread"""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        self._thread.join(timeout)
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+JARVIS Turn Tracing
+Per-turn stage timestamps written to a rotating local JSONL file
+
+Usage:
+    python tracing.py                      # summarize ~/.jarvis/traces.jsonl
+    python tracing.py traces.jsonl --last 50 --intent ai_chat
+tracing.py
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_TRACE_FILE = os.path.join(os.path.expanduser("~"), ".jarvis", "traces.jsonl")
+
+# Stage events of a voice turn, in the order they normally happen
+EVENTS = ["wake", "end_of_speech", "endpoint", "stt_done", "intent_resolved",
+          "first_llm_token", "first_audio_out", "playback_done"]
+
+# Summary metrics: name -> (from event, to event)
+METRICS = {
+    "endpoint": ("end_of_speech", "endpoint"),
+    "stt": ("endpoint", "stt_done"),
+    "intent": ("stt_done", "intent_resolved"),
+    "first_token": ("intent_resolved", "first_llm_token"),
+    "response": ("end_of_speech", "first_audio_out"),  # what the user waits for
+    "playback": ("first_audio_out", "playback_done"),
+    "turn": ("wake", "playback_done"),
+}
+
+
+class TurnTrace:
+    """Monotonic timestamps of one turn's stages (first occurrence wins unless overwritten)"""
+
+    def __init__(self, turn_id):
+        self.turn_id = turn_id
+        self.wall_time = datetime.now().isoformat(timespec="seconds")
+        self.origin = time.monotonic()
+        self.events = {}
+        self.fields = {}
+        self.playing = 0       # tracked playback futures still running
+        self.closed = False    # process_command has returned
+        self.finished = False  # record written
+        self._lock = threading.Lock()
+
+    def mark(self, event, overwrite=False):
+        now = time.monotonic()
+        with self._lock:
+            if overwrite or event not in self.events:
+                self.events[event] = now
+
+    def annotate(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def record(self):
+        """JSON-ready dict; event times in seconds since the turn began"""
+        with self._lock:
+            events = {event: round(at - self.origin, 4)
+                      for event, at in sorted(self.events.items(), key=lambda item: item[1])}
+            return {"turn": self.turn_id, "time": self.wall_time, **self.fields, "events": events}
+
+
+class Tracer:
+    """
+    Collects one TurnTrace per voice turn and appends it to a JSONL file,
+    rotating to file.1 .. file.N once the file exceeds max_bytes.
+    A turn ends when process_command returns and the playback it tracked
+    has finished (or was interrupted by the next wake word).
+    mark() may be called from any thread; outside a turn it does nothing
+    """
+
+    def __init__(self, path=DEFAULT_TRACE_FILE, max_bytes=1024 * 1024, backups=3, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = enabled
+        self.current = None
+        self._turns = 0
+        self._write_lock = threading.Lock()
+        if enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @contextmanager
+    def turn(self, **fields):
+        """Trace one turn; its clock starts at the wake word"""
+        if not self.enabled:
+            yield None
+            return
+
+        previous = self.current
+        if previous is not None:
+            # Still speaking when the wake word fired again (barge-in)
+            previous.annotate(interrupted=True)
+            self._finish(previous)
+
+        self._turns += 1
+        trace = TurnTrace(self._turns)
+        trace.mark("wake")
+        trace.annotate(**fields)
+        self.current = trace
+        try:
+            yield trace
+        finally:
+            with trace._lock:
+                trace.closed = True
+                done = trace.playing == 0
+            if done:
+                self._finish(trace)
+
+    def track(self, future):
+        """Keep the current turn open until this playback future resolves"""
+        trace = self.current
+        if trace is None:
+            return
+        with trace._lock:
+            trace.playing += 1
+        future.add_done_callback(lambda f: self._playback_ended(trace, f))
+
+    def _playback_ended(self, trace, future):
+        if future.cancelled() or future.exception() is not None or future.result() is False:
+            trace.annotate(interrupted=True)
+        with trace._lock:
+            trace.playing -= 1
+            done = trace.closed and trace.playing == 0
+        if done:
+            self._finish(trace)
+
+    def _finish(self, trace):
+        with trace._lock:
+            if trace.finished:
+                return
+            trace.finished = True
+        trace.mark("playback_done")
+        if self.current is trace:
+            self.current = None
+        self._write(trace.record())
+
+    def mark(self, event, overwrite=False):
+        trace = self.current
+        if trace is not None:
+            trace.mark(event, overwrite)
+
+    def annotate(self, **fields):
+        trace = self.current
+        if trace is not None:
+            trace.annotate(**fields)
+
+    def _write(self, record):
+        line = json.dumps(record) + "\n"
+        with self._write_lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Trace write failed: {e}")
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def load_records(path=DEFAULT_TRACE_FILE, backups=3):
+    """All trace records, oldest first (rotated files included)"""
+    records = []
+    for name in [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        pass  # truncated last line after a crash
+    return records
+
+
+def summarize(records):
+    """{metric: {p50, p90, p99, max, n}} in milliseconds"""
+    values = {metric: [] for metric in METRICS}
+    for record in records:
+        events = record.get("events", {})
+        for metric, (start, end) in METRICS.items():
+            if start in events and end in events:
+                values[metric].append((events[end] - events[start]) * 1000)
+
+    summary = {}
+    for metric, samples in values.items():
+        if not samples:
+            continue
+        samples.sort()
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+        summary[metric] = {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99),
+                           "max": samples[-1], "n": len(samples)}
+    return summary
+
+
+def print_summary(records):
+    summary = summarize(records)
+    print(f"{len(records)} turns")
+    intents = {}
+    for record in records:
+        intent = record.get("intent", "none")
+        intents[intent] = intents.get(intent, 0) + 1
+    print("Intents: " + ", ".join(f"{intent} {count}" for intent, count in sorted(intents.items())))
+
+    print(f"\n{'metric':<14}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}{'n':>6}   (ms)")
+    for metric, row in summary.items():
+        start, end = METRICS[metric]
+        print(f"{metric:<14}{row['p50']:>8.0f}{row['p90']:>8.0f}{row['p99']:>8.0f}{row['max']:>8.0f}"
+              f"{row['n']:>6}   {start} → {end}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize JARVIS turn traces")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRACE_FILE)
+    parser.add_argument("--last", type=int, help="only the most recent N turns")
+    parser.add_argument("--intent", help="only turns with this intent (e.g. ai_chat)")
+    args = parser.parse_args()
+
+    records = load_records(args.path)
+    if args.intent:
+        records = [record for record in records if record.get("intent") == args.intent]
+    if args.last:
+        records = records[-args.last:]
+    print_summary(records)
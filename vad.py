@@ -0,0 +1,210 @@
+"""
+JARVIS Voice Activity Detection
+Silero VAD behind one small interface: ONNX Runtime (no torch) or the PyTorch model
+vad.py
+"""
+
+import importlib.util
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def find_silero_onnx():
+    """
+    Path of the ONNX model shipped inside the silero_vad package.
+    Located with find_spec so silero_vad/__init__ (which imports torch) never runs
+    """
+    spec = importlib.util.find_spec("silero_vad")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    for location in spec.submodule_search_locations:
+        path = os.path.join(location, "data", "silero_vad.onnx")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class VoiceActivityDetector(ABC):
+    """
+    Streaming speech detector.
+    Call it with consecutive chunks (512 samples at 16kHz, 256 at 8kHz) of
+    float32 [-1, 1] or int16 audio; it returns the speech probability of
+    each chunk. The recurrent state carries over between calls until reset()
+    """
+
+    name = "base"
+
+    def __init__(self, sample_rate=16000):
+        if sample_rate not in (8000, 16000):
+            raise ValueError(f"Silero VAD supports 8000 or 16000 Hz, not {sample_rate}")
+        self.sample_rate = sample_rate
+        self.chunk_size = 512 if sample_rate == 16000 else 256
+
+    @abstractmethod
+    def __call__(self, chunk):
+        """Speech probability (0-1) of one chunk"""
+
+    @abstractmethod
+    def reset(self):
+        """Forget the state (call at the start of each recording)"""
+
+    @staticmethod
+    def _as_float(chunk):
+        chunk = np.asarray(chunk).reshape(-1)
+        if chunk.dtype == np.int16:
+            return chunk.astype(np.float32) / 32768.0
+        return chunk.astype(np.float32, copy=False)
+
+
+class OnnxSileroVAD(VoiceActivityDetector):
+    """Silero VAD on ONNX Runtime; state and audio context are plain numpy arrays"""
+
+    name = "onnx"
+
+    def __init__(self, model_path=None, sample_rate=16000, threads=1):
+        super().__init__(sample_rate)
+        import onnxruntime
+
+        model_path = model_path or find_silero_onnx()
+        if not model_path:
+            raise FileNotFoundError("silero_vad.onnx not found (pip install silero-vad)")
+
+        options = onnxruntime.SessionOptions()
+        options.inter_op_num_threads = 1
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        # The model looks at the tail of the previous chunk as context
+        self.context_size = 64 if sample_rate == 16000 else 32
+        self._input = np.zeros((1, self.context_size + self.chunk_size), dtype=np.float32)
+        self._sr = np.array(sample_rate, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._input[:] = 0.0
+
+    def __call__(self, chunk):
+        chunk = self._as_float(chunk)
+        if len(chunk) != self.chunk_size:
+            raise ValueError(f"expected {self.chunk_size} samples, got {len(chunk)}")
+
+        # [previous context | chunk], built in place
+        self._input[0, :self.context_size] = self._input[0, -self.context_size:]
+        self._input[0, self.context_size:] = chunk
+
+        output, self._state = self.session.run(
+            None, {"input": self._input, "state": self._state, "sr": self._sr}
+        )
+        return float(output[0, 0])
+
+
+class TorchSileroVAD(VoiceActivityDetector):
+    """The original PyTorch Silero model (fallback when onnxruntime isn't installed)"""
+
+    name = "torch"
+
+    def __init__(self, sample_rate=16000):
+        super().__init__(sample_rate)
+        import torch
+        from silero_vad import load_silero_vad
+
+        torch.set_num_threads(1)
+        self._torch = torch
+        self.model = load_silero_vad()
+        self.model.eval()
+
+    def reset(self):
+        self.model.reset_states()
+
+    def __call__(self, chunk):
+        tensor = self._torch.from_numpy(self._as_float(chunk))
+        with self._torch.no_grad():
+            return self.model(tensor, self.sample_rate).item()
+
+
+def load_vad(backend="auto", sample_rate=16000, onnx_path=None):
+    """
+    Drop-in replacement for silero_vad.load_silero_vad
+    backend: "onnx", "torch" or "auto" (ONNX if onnxruntime is available, else torch)
+    """
+    if backend in ("auto", "onnx"):
+        try:
+            return OnnxSileroVAD(onnx_path, sample_rate=sample_rate)
+        except (ImportError, FileNotFoundError) as e:
+            if backend == "onnx":
+                raise
+            print(f"ONNX VAD unavailable ({e}); falling back to PyTorch")
+    if backend in ("auto", "torch"):
+        return TorchSileroVAD(sample_rate=sample_rate)
+    raise ValueError(f"Unknown VAD backend: {backend}")
+
+
+class EnergyGate:
+    """
+    Cheap RMS / zero-crossing check in front of the neural VAD.
+    Chunks that are clearly silent (close to the room's noise floor, or
+    noise-like: quiet with many zero crossings) are rejected without running
+    the model; anything ambiguous goes on to the VAD. The noise floor adapts
+    from chunks judged silent and carries over between recordings; it only
+    ever learns from chunks quieter than max_floor, so a soft speech onset
+    the VAD rejected can't raise it to speech level.
+    """
+
+    def __init__(self, margin_db=6.0, noise_margin_db=12.0, max_zcr=0.3,
+                 absolute_floor=1e-3, max_floor=0.01, adapt_rate=0.01):
+        self.margin = 10 ** (margin_db / 20)              # "silent" within this of the floor
+        self.noise_margin = 10 ** (noise_margin_db / 20)  # noise-like chunks up to this
+        self.max_zcr = max_zcr              # zero crossings per sample above which audio is noise-like
+        self.absolute_floor = absolute_floor  # RMS that is always silence (~-60 dBFS)
+        self.max_floor = max_floor          # loudest plausible room noise (~-40 dBFS); floor never exceeds it
+        self.adapt_rate = adapt_rate        # upward tracking per silent chunk (down is immediate)
+        self.noise_floor = None             # learned from the VAD's first verdicts
+        self.skipped = 0
+        self.checked = 0
+        self._rms = 0.0
+
+    def is_silent(self, chunk):
+        """True if the chunk can skip the VAD (float32 [-1, 1] samples)"""
+        rms = float(np.sqrt(np.dot(chunk, chunk) / len(chunk)))
+        self._rms = rms
+
+        silent = rms < self.absolute_floor
+        if not silent and self.noise_floor is not None:
+            if rms < self.noise_floor * self.margin:
+                silent = True
+                self._adapt(rms)
+            elif rms < self.noise_floor * self.noise_margin:
+                # Hiss/fan noise: quiet but crossing zero far more often than voiced speech
+                signs = np.signbit(chunk)
+                zcr = np.count_nonzero(signs[1:] != signs[:-1]) / len(chunk)
+                silent = zcr > self.max_zcr
+
+        if silent:
+            self.skipped += 1
+        else:
+            self.checked += 1
+        return silent
+
+    def observe(self, speech):
+        """Feed back the VAD verdict for the last chunk that was not skipped"""
+        # Loud non-speech (music, TV) is left to the VAD rather than raising the floor
+        if not speech and (self.noise_floor is None or self._rms < self.noise_floor * self.noise_margin):
+            self._adapt(self._rms)
+
+    def _adapt(self, rms):
+        if rms > self.max_floor:
+            return  # too loud to be room noise
+        rms = max(rms, self.absolute_floor)
+        if self.noise_floor is None or rms < self.noise_floor:
+            self.noise_floor = rms  # follow a quieter room immediately
+        else:
+            self.noise_floor += self.adapt_rate * (rms - self.noise_floor)
+
+    def reset_counts(self):
+        self.skipped = 0
+        self.checked = 0